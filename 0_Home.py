@@ -9,7 +9,12 @@ This version:   October 23rd, 2023
 
 import streamlit as st
 import pandas as pd
-from tools import sidemenu
+import dropbox
+from tools import sidemenu, passcheck, data_tools
+
+# Copy-on-write is enabled for the whole process, as the datasets held by data_tools are shared by
+# every page and session and frames derived from them must never write back into them
+pd.set_option("mode.copy_on_write", True)
 
 # Page config
 st.set_page_config(
@@ -41,6 +46,18 @@ def load_codebook():
 datamap  = load_datamap()
 codebook = load_codebook() 
 
+# Warming up the dashboard data in the background (once per app process)
+try:
+    dbtoken  = st.secrets["dbtoken"]
+    dbkey    = st.secrets["app_key"]
+    dbsecret = st.secrets["app_secret"]
+except (FileNotFoundError, KeyError):
+    dbtoken  = None
+if dbtoken is not None:
+    atoken = passcheck.retrieve_DBtoken(dbkey, dbsecret, dbtoken)
+    data_tools.prefetch_datasets(dropbox.Dropbox(atoken))
+    data_tools.watch_datasets()
+
 # st.markdown("<h1 style='text-align: center;'>EU-S Copilot</h1>", 
 #             unsafe_allow_html=True)
 st.markdown(
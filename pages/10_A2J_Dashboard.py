@@ -14,13 +14,17 @@ import numpy as np
 import geopandas as gpd
 import streamlit as st
 import plotly.express as px
+import plotly.io as pio
 from tools import viz_tools as viz
-from tools import passcheck, sidemenu
+from tools import passcheck, sidemenu, data_tools, prep_tools
 import dropbox
 import dropbox.files
-from io import BytesIO
 from plotly.subplots import make_subplots
 
+# Copy-on-write is enabled for the whole process, as the datasets held by data_tools are shared by
+# every page and session and frames derived from them must never write back into them
+pd.set_option("mode.copy_on_write", True)
+
 # page configuration
 st.set_page_config(
     page_title= "Access to Justice Journey",
@@ -48,44 +52,13 @@ if passcheck.check_password():
     # Accessing Dropbox
     dbx = dropbox.Dropbox(atoken)
 
-    # loading function
-    @st.cache_data
-    def load_DBfile(file, format, sheet=None):
-
-        # accessing dropbox files
-        __, res = dbx.files_download(f"/{file}")
-        data = res.content
-
-    # reading data frames
-        with BytesIO(data) as file:
-            if format == 'excel':
-                df = pd.read_excel(file, sheet_name = sheet)
-            if format == 'csv':
-                df = pd.read_csv(file)
-        return df
-
-
+    # refreshing the shared datasets whenever their files change in dropbox
+    data_tools.watch_datasets()
 
+    gpp_datapoints = data_tools.get_dataset(dbx, "gpp")
 
-
-    gpp_datapoints = load_DBfile("data4web_gpp.csv", format = 'csv')
-
-    # load wrangled A2J data
-    sections = [f"Section{i}" for i in range(1,7)]
-    data = {section: load_DBfile("A2J_justicejourney_wrangled.xlsx", format = 'excel', sheet = section) for section in sections}
-
-    # load sheets
-    section1 = data["Section1"].mask(data["Section1"]['total_count'] < 30)
-    section2 = data["Section2"]
-    section3 = data["Section3"].mask(data["Section3"]['total_sources'] < 30)
-    section4 = data["Section4"]
-    section5 = data["Section5"]
-    section6 = data["Section6"]
-
-    # impute values with observation count <= 30
-    count_sections = ['Section2', 'Section4', 'Section5',  'Section6']
-    for section in count_sections:
-        data[section] = data[section].mask(data[section]['count'] < 30)
+    # country rows and EU averages of every section, for each demographic option
+    a2j_views = prep_tools.a2j_views(dbx)
 
 
     # header and explanation
@@ -115,7 +88,7 @@ if passcheck.check_password():
     )
 
     #####################################################################################################################
-    #                                               FILTERING - NATIONAL LEVEL                                          #
+    #                                                      FILTERING                                                    #
     #####################################################################################################################
 
     if eu_or_country == "Country":
@@ -128,227 +101,13 @@ if passcheck.check_password():
 
         level = 'national' # for later filtering
 
-        if demographic == 'Total sample':
-            section1 = section1.loc[(section1['country_name_ltn'] == country) & (section1['demographic'] == 'Total sample')]
-            section2 = section2.loc[(section2['country_name_ltn'] == country) & (section2['demographic'] == "Total Sample")]
-            section3 = section3.loc[(section3['country_name_ltn'] == country) & (section3['demographic'] == 'Total sample')]
-            section4 = section4.loc[(section4['country_name_ltn'] == country) & (section4['demographic'] == "Total Sample")]
-            section5 = section5.loc[(section5['country_name_ltn'] == country) & (section5['demographic'] == 'Total Sample')]
-            section6 = section6.loc[(section6['country_name_ltn'] == country) & (section6['demographic'] == 'Total sample')]
-
-        if demographic == 'Disagreggated by Gender':
-            section1 = section1.loc[(section1['country_name_ltn'] == country) & ((section1['demographic'] == 'Male') | (section1['demographic'] == 'Female'))]
-            section2 = section2.loc[(section2['country_name_ltn'] == country) & ((section2['demographic'] == 'Male') | (section2['demographic'] == 'Female'))]
-            section3 = section3.loc[(section3['country_name_ltn'] == country) & ((section3['demographic'] == 'Male') | (section3['demographic'] == 'Female') )]
-            section4 = section4.loc[(section4['country_name_ltn'] == country) & ((section4['demographic'] == 'Male') | (section4['demographic'] == 'Female'))]
-            section5 = section5.loc[(section5['country_name_ltn'] == country) & ((section5['demographic'] == 'Male') | (section5['demographic'] == 'Female'))]
-            section6 = section6.loc[(section6['country_name_ltn'] == country) & ((section6['demographic'] == 'Male') | (section6['demographic'] == 'Female'))]
-
-        if demographic == 'Disagreggated by Income':
-            section1 = section1.loc[(section1['country_name_ltn'] == country) & ((section1['demographic'] == 'Financially Tight') | (section1['demographic'] == 'Financially Stable'))]
-            section2 = section2.loc[(section2['country_name_ltn'] == country) & ((section2['demographic'] == 'Financially Tight') | (section2['demographic'] == 'Financially Stable'))]
-            section3 = section3.loc[(section3['country_name_ltn'] == country) & ((section3['demographic'] == 'Financially Tight') | (section3['demographic'] == 'Financially Stable') )]
-            section4 = section4.loc[(section4['country_name_ltn'] == country) & ((section4['demographic'] == 'Financially Tight') | (section4['demographic'] == 'Financially Stable'))]
-            section5 = section5.loc[(section5['country_name_ltn'] == country) & ((section5['demographic'] == 'Financially Tight') | (section5['demographic'] == 'Financially Stable'))]
-            section6 = section6.loc[(section6['country_name_ltn'] == country) & ((section6['demographic'] == 'Financially Tight') | (section6['demographic'] == 'Financially Stable'))]
-
-
-    ######################################################################################################################
-    #                                                   FILTERING - EU LEVEL                                             #
-    ######################################################################################################################
     if eu_or_country == "EU":
         country = 'European Union' # for filtering gpp datapoints
         level = 'eu'
-        # gather dataset for eu
-        if demographic == "Total sample" :
-            section1 = pd.DataFrame({
-                'country_name_ltn': "European Union",
-                'demographic': "Total sample",
-                'category': section1.loc[section1['demographic'] == "Total sample"].groupby('category')['value2plot'].mean().index,
-                'value2plot': section1.loc[section1['demographic'] == "Total sample"].groupby('category')['value2plot'].mean().values
-            })
-
-            section2 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : 'Total sample',
-                'advice' : [
-                    section2.loc[section2['demographic'] == 'Total Sample', 'advice'].mean()
-                ],
-                'get_information': [
-                        section2.loc[section2['demographic'] == 'Total Sample', 'get_information'].mean()
-                    ],
-                    'get_expert': [
-                        section2.loc[section2['demographic'] == 'Total Sample', 'get_expert'].mean()
-                    ],
-                    'confidence': [
-                        section2.loc[section2['demographic'] == 'Total Sample', 'confidence'].mean()
-                    ]
-            })
-
-            section3 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : 'Total sample',
-                'adviser' : section3.loc[section3['demographic'] == 'Total sample'].groupby('adviser')['value2plot'].mean().index,
-                'value2plot' : section3.loc[section3['demographic'] == 'Total sample'].groupby('adviser')['value2plot'].mean().values
-            })
-
-            section4 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : 'Total sample',
-                'fully_resolved': [
-                        section4.loc[section4['demographic'] == 'Total Sample', 'fully_resolved'].mean()
-                    ],
-                'problem_persists': [
-                        section4.loc[section4['demographic'] == 'Total Sample', 'problem_persists'].mean()
-                    ],
-                'satisfaction' : [
-                        section4.loc[section4['demographic'] == 'Total Sample', 'satisfaction'].mean()
-                ]
-            })
-
-            section5 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : 'Total sample',
-                'fair' : [section5.loc[section5['demographic'] == 'Total Sample', 'fair'].mean()],
-                'time' : [section5.loc[section5['demographic'] == 'Total Sample', 'time'].mean()],
-                'financial_diff' : [section5.loc[section5['demographic'] == 'Total Sample', 'financial_diff'].mean()],
-                'slow' : [section5.loc[section5['demographic'] == 'Total Sample', 'slow'].mean()],
-                'expensive' : [section5.loc[section5['demographic'] == 'Total Sample', 'expensive'].mean()]
-            })
-
-            section6 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : 'Total sample',
-                'any_hardship' : [section6.loc[section6['demographic'] == 'Total sample', 'any_hardship'].mean()],
-                'health' : [section6.loc[section6['demographic'] == "Total sample", 'health'].mean()] ,
-                'interpersonal' :[section6.loc[section6['demographic'] == 'Total sample', 'interpersonal'].mean()] ,
-                'economic' : [section6.loc[section6['demographic'] == 'Total sample', 'interpersonal'].mean()], 
-                'drugs' : [section6.loc[section6['demographic'] == 'Total sample', 'drugs'].mean()]
-            })
-
-
-        if demographic == "Disagreggated by Gender" :
-            section1 = section1.loc[
-                (section1['demographic'] == 'Male') | (section1['demographic'] == 'Female')
-            ].groupby(['demographic', 'category'])['value2plot'].mean().reset_index()
-            section1 = pd.DataFrame({
-                'country_name_ltn': 'European Union',
-                'demographic': section1['demographic'],  
-                'category': section1['category'],        
-                'value2plot': section1['value2plot']    
-            })
-
-
-            section2 = section2.loc[
-                (section2['demographic'] == 'Male') | (section2['demographic'] == 'Female')
-                ].groupby('demographic')[['get_expert', 'get_information', 'confidence', 'advice' ]].mean().reset_index()
-            section2 = pd.DataFrame({
-                'country_name_ltn': 'European Union',
-                'demographic': section2['demographic'],  # Filtered demographics
-                'get_information': pd.to_numeric(section2['get_information'], errors = 'coerce'),  
-                'get_expert': pd.to_numeric(section2['get_expert'], errors = 'coerce'),            
-                'confidence': pd.to_numeric(section2['confidence'], errors = 'coerce'),
-                'advice' : pd.to_numeric(section2['advice'], errors = 'coerce')            
-            })
-
-            section3 = section3.loc[(section3['demographic'] == 'Male') | (section3['demographic'] == 'Female')].groupby(['demographic', 'adviser'])['value2plot'].mean().reset_index()
-            section3 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section3['demographic'],
-                'adviser' : section3['adviser'],
-                'value2plot' : section3['value2plot']
-            })
-
-            section4 = section4.loc[(section4['demographic'] == 'Male') | (section4['demographic'] == 'Female')].groupby('demographic')[['fully_resolved', 'problem_persists', 'satisfaction']].mean().reset_index()
-            section4 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section4['demographic'],
-                'fully_resolved' : section4['fully_resolved'],
-                'problem_persists' : section4['problem_persists'],
-                'satisfaction' : section4['satisfaction']
-            })
-
-            section5 = section5.loc[(section5['demographic'] == 'Male') | (section5['demographic'] == 'Female')].groupby('demographic')[['fair', 'time', 'financial_diff', 'slow', 'expensive']].mean().reset_index()
-            section5 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section5['demographic'],
-                'fair' : section5['fair'],
-                'time' : section5['time'],
-                'financial_diff' : section5['financial_diff'],
-                'slow' : section5['slow'],
-                'expensive' : section5['expensive']
-            })
-
-            section6 = section6.loc[(section6['demographic'] == 'Male') | (section6['demographic'] == 'Female')].groupby('demographic')[['any_hardship', 'health', 'interpersonal', 'economic', 'drugs']].mean().reset_index()
-            section6 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section6['demographic'],
-                'any_hardship' : section6['any_hardship'],
-                'health' : section6['health'],
-                'interpersonal' : section6['interpersonal'],
-                'economic' : section6['economic'],
-                'drugs' : section6['drugs']
-            })
-            
-        if demographic == "Disagreggated by Income" :
-            section1 = section1.loc[(section1['demographic'] == 'Financially Tight') | (section1['demographic'] == 'Financially Stable')].groupby(['demographic', 'category'])[['total_count', 'value2plot', 'total_incidents']].mean().reset_index()
-            section1 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section1['demographic'],
-                'category' : section1['category'],
-                'value2plot' : section1['value2plot'],
-                'total_count' : section1['total_count'],
-                'total_incidents' : section1['total_incidents']
-                })
-
-            section2 = section2.loc[(section2['demographic'] == 'Financially Tight') | (section2['demographic'] == 'Financially Stable')].groupby('demographic')[['get_information', 'get_expert', 'confidence', 'advice']].mean().reset_index()
-            section2= pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section2['demographic'],
-                'get_expert' : section2['get_expert'],
-                'get_information' : section2['get_information'],
-                'confidence' : section2['confidence'],
-                'advice' : section2['advice']         
-            })
-    
-            section3 = section3.loc[(section3['demographic'] == 'Financially Tight') | (section3['demographic'] == 'Financially Stable')].groupby(['demographic', 'adviser'])['value2plot'].mean().reset_index()
-            section3 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section3['demographic'],
-                'adviser' : section3['adviser'],
-                'value2plot' : section3['value2plot']
-            })
-
-            section4 = section4.loc[(section4['demographic'] == 'Financially Tight') | (section4['demographic'] == 'Financially Stable')].groupby('demographic')[['fully_resolved', 'problem_persists', 'satisfaction']].mean().reset_index()
-            section4 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section4['demographic'],
-                'fully_resolved' : section4['fully_resolved'],
-                'problem_persists' : section4['problem_persists'],
-                'satisfaction' : section4['satisfaction']
-            })
-            section5 = section5.loc[(section5['demographic'] == 'Financially Tight') | (section5['demographic'] == 'Financially Stable')].groupby('demographic')[['fair', 'time', 'financial_diff', 'slow', 'expensive']].mean().reset_index()
-            section5 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section5['demographic'],
-                'fair' : section5['fair'],
-                'time' : section5['time'],
-                'financial_diff' : section5['financial_diff'],
-                'slow' : section5['slow'],
-                'expensive' : section5['expensive']
-            })
-
-            section6 = section6.loc[(section6['demographic'] == 'Financially Tight') | (section6['demographic'] == 'Financially Stable')].groupby('demographic')[['any_hardship', 'health', 'interpersonal', 'economic', 'drugs']].mean().reset_index()
-            section6 = pd.DataFrame({
-                'country_name_ltn' : 'European Union',
-                'demographic' : section6['demographic'],
-                'any_hardship' : section6['any_hardship'],
-                'health' : section6['health'],
-                'interpersonal' : section6['interpersonal'],
-                'economic' : section6['economic'],
-                'drugs' : section6['drugs']
-            })
 
+    section1, section2, section3, section4, section5, section6 = prep_tools.a2j_sections(
+        a2j_views, eu_or_country, country, demographic
+    )
 
 
     # viz
@@ -362,7 +121,7 @@ if passcheck.check_password():
     if demographic == "Total sample": 
         # 1. LEGAL PROCESS
         prevalence = gpp_datapoints.loc[(gpp_datapoints['country'] == country) & (gpp_datapoints['level'] == level) & 
-                                        (gpp_datapoints['id'] == 'prevalence2') & (gpp_datapoints['demographic'] == 'Total Sample')]['value'].iloc[0] * 100
+                                        (gpp_datapoints['id'] == 'prevalence2') & (gpp_datapoints['demographic'] == 'Total Sample')]['value2plot'].iloc[0] * 100
         st.markdown(
             f"""
             <h3 style='text-align: center;'>
@@ -381,25 +140,14 @@ if passcheck.check_password():
             unsafe_allow_html=True
         )
 
-        fig1 = px.scatter(
-            section1,
-            x='value2plot',
-            y='category',
-            color='category',
-        )
-        category_colors = {trace.name: trace.marker.color for trace in fig1.data}
-
-
-        for index, row in section1.iterrows():
-            fig1.add_trace(
-                go.Scatter(
-                    x=[0, row['value2plot']],  
-                    y=[row['category'], row['category']],  
-                    mode='lines',
-                    line=dict(color=category_colors[row['category']], width=2),  
-                    showlegend=False 
-                )
-            )
+        # One colour per category, in order of appearance, from the colorway of the active
+        # template as plotly express would do
+        palette = pio.templates[pio.templates.default].layout.colorway or px.colors.qualitative.Plotly
+        category_colors = {
+            category: palette[i % len(palette)]
+            for i, category in enumerate(section1['category'].drop_duplicates())
+        }
+        fig1 = viz.genLollipops(go.Figure(), section1, section1['category'].map(category_colors))
         fig1.update_traces(
             hovertemplate = 'Category: %{y} <br> Prevalence: %{x:.2f}%'
 
@@ -412,6 +160,8 @@ if passcheck.check_password():
             template="plotly_white",
             showlegend = False,
             xaxis = dict(range = (0,100)),
+            yaxis = dict(categoryorder = 'array', categoryarray = list(category_colors)[::-1]),
+            margin = dict(t = 60)
         )
 
         st.plotly_chart(fig1)
@@ -642,10 +392,10 @@ if passcheck.check_password():
 
     if demographic == 'Disagreggated by Gender':
         prevalence_male = gpp_datapoints.loc[(gpp_datapoints['country'] == country) & (gpp_datapoints['level'] == level) & 
-                                        (gpp_datapoints['id'] == 'prevalence2') & (gpp_datapoints['demographic'] == 'Male')]['value'].iloc[0] * 100
+                                        (gpp_datapoints['id'] == 'prevalence2') & (gpp_datapoints['demographic'] == 'Male')]['value2plot'].iloc[0] * 100
         
         prevalence_female = gpp_datapoints.loc[(gpp_datapoints['country'] == country) & (gpp_datapoints['level'] == level) & 
-                                        (gpp_datapoints['id'] == 'prevalence2') & (gpp_datapoints['demographic'] == 'Female')]['value'].iloc[0] * 100
+                                        (gpp_datapoints['id'] == 'prevalence2') & (gpp_datapoints['demographic'] == 'Female')]['value2plot'].iloc[0] * 100
         
         import streamlit as st
 
@@ -695,59 +445,12 @@ if passcheck.check_password():
             shared_yaxes=True,  # Share the y-axis for better comparison
         )
 
-        # Scatter plot for Male
-        fig.add_trace(
-            go.Scatter(
-                x=male_1['value2plot'],
-                y=male_1['category'],
-                mode='markers',
-                marker=dict(color='blue'),
-                name='Male',
-            ),
-            row=1, col=1  # First panel
-        )
-
-        # Add horizontal lines for Male
-        for _, row in male_1.iterrows():
-            fig.add_trace(
-                go.Scatter(
-                    x=[0, row['value2plot']],
-                    y=[row['category'], row['category']],
-                    mode='lines',
-                    line=dict(color='blue', width=2),
-                    showlegend=False,
-                ),
-                row=1, col=1,
-            )
-
-        # Scatter plot for Female
-        fig.add_trace(
-            go.Scatter(
-                x=female_1['value2plot'],
-                y=female_1['category'],
-                mode='markers',
-                marker=dict(color='pink'),
-                name='Female',
-            ),
-            row=1, col=2  # Second panel
-        )
+        viz.genLollipops(fig, male_1, 'blue', name = 'Male', row = 1, col = 1)
+        viz.genLollipops(fig, female_1, 'pink', name = 'Female', row = 1, col = 2)
         fig.update_traces(
             hovertemplate = 'Category: %{y} <br> Value: %{x:.2f}% '
         )
 
-        # Add horizontal lines for Female
-        for _, row in female_1.iterrows():
-            fig.add_trace(
-                go.Scatter(
-                    x=[0, row['value2plot']],
-                    y=[row['category'], row['category']],
-                    mode='lines',
-                    line=dict(color='pink', width=2),
-                    showlegend=False,
-                ),
-                row=1, col=2,
-            )
-
         fig.update_layout(
             title="Legal Process by Gender",
             xaxis_title="Percentage of Respondents",
@@ -1184,53 +887,8 @@ if passcheck.check_password():
             shared_yaxes=True,  # Share the y-axis for better comparison
         )
 
-        fig.add_trace(
-            go.Scatter(
-                x=lowes_1['value2plot'],
-                y=lowes_1['category'],
-                mode='markers',
-                marker=dict(color='#B33C86'),
-                name='Tight',
-            ),
-            row=1, col=1  # First panel
-        )
-
-        for _, row in lowes_1.iterrows():
-            fig.add_trace(
-                go.Scatter(
-                    x=[0, row['value2plot']],
-                    y=[row['category'], row['category']],
-                    mode='lines',
-                    line=dict(color='#B33C86', width=2),
-                    showlegend=False,
-                ),
-                row=1, col=1,
-            )
-
-        fig.add_trace(
-            go.Scatter(
-                x=highes_1['value2plot'],
-                y=highes_1['category'],
-                mode='markers',
-                marker=dict(color='#1C7C54'),
-                name='Stable'
-            ),
-            row=1, col=2  # Second panel
-        )
-
-        fig.update_layout(xaxis = dict(range = (0,100)))
-
-        for _, row in highes_1.iterrows():
-            fig.add_trace(
-                go.Scatter(
-                    x=[0, row['value2plot']],
-                    y=[row['category'], row['category']],
-                    mode='lines',
-                    line=dict(color='#1C7C54', width=2),
-                    showlegend=False
-                ),
-                row=1, col=2,
-            )
+        viz.genLollipops(fig, lowes_1, '#B33C86', name = 'Tight', row = 1, col = 1)
+        viz.genLollipops(fig, highes_1, '#1C7C54', name = 'Stable', row = 1, col = 2)
         fig.update_traces(
             hovertemplate = 'Category: %{y} <br> Value: %{x:.2f}%'
         )
@@ -15,10 +15,13 @@ import geopandas as gpd
 import streamlit as st
 import plotly.express as px
 from tools import viz_tools as viz
-from tools import passcheck, sidemenu
+from tools import passcheck, sidemenu, data_tools, prep_tools
 import dropbox
 import dropbox.files
-from io import BytesIO
+
+# Copy-on-write is enabled for the whole process, as the datasets held by data_tools are shared by
+# every page and session and frames derived from them must never write back into them
+pd.set_option("mode.copy_on_write", True)
 
 # page configuration
 st.set_page_config(
@@ -46,86 +49,21 @@ atoken = passcheck.retrieve_DBtoken(dbkey, dbsecret, dbtoken)
     # Accessing Dropbox
 dbx = dropbox.Dropbox(atoken)
 
-# Defining a loading function
-@st.cache_data
-def load_DBfile(file, format):
-
-    # Accessing Dropbox files
-    _, res = dbx.files_download(f"/{file}")
-    data = res.content
-
-    # Reading data frames
-    with BytesIO(data) as file:
-        if format == 'excel':
-            df = pd.read_excel(file)
-        if format == 'csv':
-            df = pd.read_csv(file)
-
-    return df
-
-
-
-
-@st.cache_data
-def load_rlabels():
-    df = pd.read_excel("https://github.com/WJP-DAU/eu-gpp-report/raw/main/data-viz/inputs/region_labels.xlsx")
-    return df
-
+# Refreshing the shared datasets whenever their files change in Dropbox
+data_tools.watch_datasets()
 
-# load mlayer for map
-@st.cache_data
-def load_mlayer():
-    df = gpd.read_file("inputs/EU_base_map.geojson").to_crs(epsg=4326)
-    return df
-# def load_mlayer():
-#     df = gpd.read_file("https://raw.githubusercontent.com/ctoruno/ROLI-Map-App/main/Data/EU_base_map.geojson").to_crs(epsg=4326)
-#     return df
-
-
-def realign_data(value, direction):
-    if direction == "positive":
-        return value
-    if direction == "negative":
-        return 1-value
-data_points   = load_DBfile("data4web_qrq.csv", format = 'csv')
-outline       = load_DBfile("report_outline.xlsx", format = 'excel')
-data_points_gpp = load_DBfile("data4web_gpp.csv", format = 'csv')
-data_points_gpp = (
-    data_points_gpp
-    .loc[data_points_gpp["demographic"] == "Total Sample"]
-)
-region_labels = load_rlabels()
+# Columnar snapshot of data4web_qrq.csv (renamed and joined with the report outline)
+qrq             = prep_tools.qrq_frames(dbx)
+data_points     = qrq.data_points
+indicators      = qrq.indicators
+region_labels = data_tools.get_dataset(dbx, "region_labels")
 # omit A2J for now
 # outline = outline.loc[outline['chapter'] != 'Access to Justice']
-eu_nuts       = load_mlayer()
-data_points.rename(columns = {
-    'theme': 'report',
-    'pillar_name': 'chapter',
-    'subpillar_name': 'title',
-    'score': 'value2plot'
-}, inplace = True)
-
-data_points['section'] = data_points['title']
+eu_nuts       = data_tools.get_dataset(dbx, "map_layer")
 
 print("data_points.info():")
 print(data_points.info())
 
-data_points_gpp.rename(columns = {
-    'chapter': 'report',
-    'section': 'chapter',
-    'subsection': 'section',
-    'value': 'value2plot'
-}, inplace = True)
-
-data_points = pd.merge(
-    data_points, outline[['title','subtitle', 'direction', 'reportValue']], 
-    on = ['title', 'subtitle'], 
-    how = 'left'
-)
-
-data_points_gpp = pd.merge(data_points_gpp, outline[['title', 'direction', 'reportValue']], on = 'title', how = 'left' )
-data_points_gpp['value2plot'] = data_points_gpp['value2plot']*100
-
 
 st.markdown(
 """
@@ -195,30 +133,11 @@ with qrq_vartab:
             .country.to_list())
         )
 
-    filtered_data_points_indicator = data_points.loc[
-        (data_points['report'] == theme_indicator) & 
-        (data_points['chapter'] == chapter_indicator)
-    ]
-    chart_n = filtered_data_points_indicator.loc[
-        filtered_data_points_indicator['title'] == section_indicator, 'title'
-    ].iloc[0]
-
-    mapData = (
-        filtered_data_points_indicator.copy()
-        .loc[(filtered_data_points_indicator["title"] == chart_n) & (filtered_data_points_indicator["level"] == "regional")]
-    )
-
-    country_avgs = (
-        filtered_data_points_indicator.copy()
-        .loc[(filtered_data_points_indicator["title"] == chart_n) & (filtered_data_points_indicator["level"] == "national")]
-        .reset_index()
-    )
+    # QRQ subpillars are both the section and the title of their indicator
+    indicator = dict(report = theme_indicator, chapter = chapter_indicator, section = section_indicator, title = section_indicator)
+    chart_n   = section_indicator
 
-    eu_avg = (
-        filtered_data_points_indicator.copy()
-        .loc[(filtered_data_points_indicator["title"] == chart_n) & (filtered_data_points_indicator['level'] == "eu")]
-        .reset_index()
-    )
+    mapData = indicators.view(**indicator, level = "regional")
 
     if country_focused and len(country_select) > 0:
         mapData = (
@@ -226,27 +145,21 @@ with qrq_vartab:
             .loc[mapData['country'].isin(country_select)]
             .reset_index()
         )
-        country_avgs = (
-            country_avgs.copy()
-            .loc[country_avgs['country'].isin(country_select)]
-            .reset_index()
-        )
-
-    data4bars = (
-        pd.concat([country_avgs, eu_avg], ignore_index=True)
-        .sort_values(by = 'value2plot', ascending = True)
-    )
 
     # Defining Annotations
-    title    = data_points.copy().loc[data_points["title"] == chart_n].title.iloc[0]
-    subtitle = data_points.copy().loc[data_points["title"] == chart_n].subtitle.iloc[0]
-    reportV  = data_points.copy().loc[data_points["title"] == chart_n].reportValue.iloc[0]
-
-    # defining tabs for indicator level
-    map_tab, bars_tab, table_tab, compare_tab = st.tabs(["Sub-national Summary","National Synopsis","Detail", "GPP Contextualization"])
+    description = indicators.describe(chart_n)
+    title    = description.title
+    subtitle = description.subtitle
+    reportV  = description.reportValue
+
+    # defining tabs for indicator level, only the panel on display is evaluated
+    map_tab, bars_tab, table_tab, compare_tab = sidemenu.lazy_tabs(
+        ["Sub-national Summary","National Synopsis","Detail", "GPP Contextualization"],
+        key = "indicator_panel_qrq"
+    )
 
 
-    direction   =   data_points.copy().loc[data_points["title"] == chart_n].direction.iloc[0]
+    direction   =   description.direction
     color_codes  = ["#E03849", "#FF7900", "#FFC818", "#46B5FF", "#0C75B6", "#18538E"]
     value_breaks = [0.00, 0.20, 0.40, 0.60, 0.80, 1.00]
     if direction == "Negative":
@@ -256,7 +169,7 @@ with qrq_vartab:
     color_palette = [[color, value] for color, value in zip(value_breaks, ordered_colors)]
 
 
-    with map_tab:
+    if map_tab:
         st.markdown(
                 f"""
                 <h4 style='text-align: left;'>{title} (Regional level)</h4>
@@ -269,7 +182,7 @@ with qrq_vartab:
         map = viz.genQRQMap(data4map = mapData, eu_nuts = eu_nuts, color_palette = color_palette)
         st.plotly_chart(map, use_container_width = True)
 
-    with bars_tab:
+    if bars_tab:
         st.markdown(
             f"""
             <h4 style='text-align: left;'>{title} (Country level)</h4>
@@ -278,10 +191,18 @@ with qrq_vartab:
             """, 
             unsafe_allow_html=True
         )
+        country_avgs = indicators.view(**indicator, level = "national").reset_index()
+        eu_avg       = indicators.view(**indicator, level = "eu").reset_index()
+        if country_focused and len(country_select) > 0:
+            country_avgs = country_avgs.loc[country_avgs['country'].isin(country_select)]
+        data4bars = (
+            pd.concat([country_avgs, eu_avg], ignore_index=True)
+            .sort_values(by = 'value2plot', ascending = True)
+        )
         bars = viz.genQRQBars(data = data4bars, cpal = color_palette, level = "indicator")
         st.plotly_chart(bars, use_container_width = True)
 
-    with table_tab:
+    if table_tab:
             st.markdown(
                 f"""
                 <h4 style='text-align: left;'>{title} (Regional level)</h4>
@@ -339,7 +260,7 @@ with qrq_vartab:
             )   
 
 
-    with compare_tab:
+    if compare_tab:
         st.markdown(
             """
             The purpose of this tab is to explore the relationships between QRQ subpillar scores 
@@ -352,10 +273,15 @@ with qrq_vartab:
             unsafe_allow_html=True
         )
         # label each data source
+        data_points_gpp = data_tools.get_dataset(dbx, "gpp")
+        data_points_gpp = (
+            data_points_gpp
+            .loc[data_points_gpp["demographic"] == "Total Sample"]
+        )
+        data_points_gpp['value2plot']  = data_points_gpp['value2plot']*100
         data_points_gpp['description'] = 'gpp'
-        data_points['description'] = 'qrq'
 
-        full = pd.concat([filtered_data_points_indicator.copy(), data_points_gpp])
+        full = pd.concat([indicators.view(**indicator, level = "regional").assign(description = 'qrq'), data_points_gpp])
         # filter for regional data
         regional = full.loc[full['level'] == 'regional']
         # filter for section
@@ -420,7 +346,12 @@ with qrq_vartab:
                     unsafe_allow_html=True
                 )
 
-            compare_scatter = viz.gen_compare_scatter(compare_subset, section_indicator, gpp_indicator)
+            trend = prep_tools.trend_fit(
+                prep_tools.qrq_gpp_trends(dbx),
+                (theme_indicator, chapter_indicator, section_indicator, section_indicator),
+                (section_indicator, gpp_indicator)
+            )
+            compare_scatter = viz.gen_compare_scatter(compare_subset, section_indicator, gpp_indicator, trend)
             st.plotly_chart(compare_scatter)
             st.markdown(
             f"""
@@ -489,37 +420,8 @@ with qrq_countrytab:
 
 
     with eu_dist:
-            # generate rankings based on qrq scores
-            national = data_points.copy().loc[data_points['level'] == "national"]
-
-
-            filtered_data = national.copy().loc[(national['report'] == theme) & (
-                national['chapter'] == chapter)]
-
-            subpillars = filtered_data['title'].unique()
-
-            # generate rankings in filtered dataframe
-            # for subpillar in subpillars:
-            #     if filtered_data.copy().loc[(filtered_data['report'] == theme) & (filtered_data['chapter'] == chapter )& (filtered_data['title'] == subpillar), 'direction'].iloc[0] == 'positive':
-            #         filtered_data.loc[filtered_data['title'] == subpillar, 'ranking'] = filtered_data.loc[
-            #             filtered_data[(filtered_data['report'] == theme) & (filtered_data['chapter'] == chapter )&  (filtered_data['title'] == subpillar)].groupby(
-            #                 ['chapter', 'section','title'])['value2plot'].rank(method = 'first', ascending = False, na_option='bottom').astype(int)    
-            #     else:
-            #         filtered_data.loc[(filtered_data['report'] == theme) & (filtered_data['chapter'] == chapter )&  (filtered_data['title'] == subpillar), 'ranking'] = filtered_data.loc[
-            #             filtered_data[(filtered_data['report'] == theme) & (filtered_data['chapter'] == chapter )&  (filtered_data['title'] == subpillar)].groupby(
-            #                 ['chapter', 'section','title'])['value2plot'].rank(method = 'first', ascending = True, na_option='bottom').astype(int)  
-
-            for subpillar in subpillars:
-                filtered_data = filtered_data.drop_duplicates(subset = ['country', 'indicator'])
-                condition = (filtered_data['report'] == theme) & (filtered_data['chapter'] == chapter) & (filtered_data['title'] == subpillar)
-                if filtered_data.loc[condition, 'direction'].iloc[0] == 'positive':
-                    filtered_data.loc[condition, 'ranking'] = filtered_data.loc[condition].groupby(
-                        ['chapter', 'section', 'title'])['value2plot'].rank(method='first', ascending=False, na_option='bottom').astype(int)
-                else:
-                    filtered_data.loc[condition, 'ranking'] = filtered_data.loc[condition].groupby(
-                        ['chapter', 'section', 'title'])['value2plot'].rank(method='first', ascending=True, na_option='bottom').astype(int)
-                
-            # filtered_data = filtered_data.drop_duplicates(subset = ['country', 'indicator'])
+            # national rankings of the chosen report and chapter
+            filtered_data = qrq.rankings.get((theme, chapter), data_points.iloc[0:0]).copy()
             rankings = viz.gen_qrq_rankins(filtered_data, country, theme, chapter)
             st.plotly_chart(rankings)
 
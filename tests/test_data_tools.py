@@ -0,0 +1,183 @@
+"""
+Module Name:    Data Tools Tests
+Author:         Carlos Alberto Toruño Paniagua
+Date:           October 18th, 2026
+Description:    Tests of the data loading functions of the EU Copilot Dashboard.
+This version:   October 18th, 2026
+"""
+import io
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import requests
+from tools import data_tools
+from tools.local_services import FakeDropbox, LocalFileServer
+
+
+def wait_until(condition, timeout = 5):
+    """Waits for a condition set by a background thread, returning whether it was met."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+class ReadCsvChunkedTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix = ".csv")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_empty_dimension_in_a_chunk(self):
+        # The first chunk holds national rows without a NUTS name and numeric-looking ids
+        pd.DataFrame({
+            "country":  ["Austria", "Austria", "Austria", "Austria"],
+            "level":    ["national", "national", "regional", "regional"],
+            "nuts_ltn": [None, None, "Wien", "Tirol"],
+            "id":       ["1", "2", "q1a", "3"],
+            "value":    [0.1, 0.2, 0.3, 0.4]
+        }).to_csv(self.path, index = False)
+
+        df = data_tools.read_csv_chunked(self.path, chunksize = 2)
+
+        for col in ["country", "level", "nuts_ltn", "id"]:
+            self.assertIsInstance(df[col].dtype, pd.CategoricalDtype, col)
+        self.assertEqual(df["nuts_ltn"].cat.categories.tolist(), ["Tirol", "Wien"])
+        self.assertEqual(df["id"].cat.categories.tolist(), ["1", "2", "3", "q1a"])
+        self.assertEqual(df["nuts_ltn"].isna().tolist(), [True, True, False, False])
+        self.assertEqual(df["value"].dtype, "float32")
+
+
+class DropboxWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.dbx       = FakeDropbox({"first.csv": b"first v1", "second.csv": b"second v1"})
+        self.registry  = data_tools.DatasetRegistry()
+
+        def loader(file):
+            def load(dbx):
+                with open(data_tools.fetch_DBfile(dbx, file)) as f:
+                    return f.read()
+            return load
+
+        patches = [
+            mock.patch.object(data_tools, "CACHE_DIR", self.cache_dir),
+            mock.patch.object(data_tools, "DATASET_SOURCES", {
+                "first": ["first.csv"], "second": ["second.csv"]
+            }),
+            mock.patch.object(data_tools, "DATASET_LOADERS", {
+                "first": loader("first.csv"), "second": loader("second.csv")
+            })
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+        for name in ["first", "second"]:
+            self.registry.get(name, data_tools.DATASET_LOADERS[name], self.dbx)
+        self.watcher = data_tools.DropboxWatcher(lambda: self.dbx, self.registry, poll_timeout = 1)
+        self.watcher.start()
+        self.addCleanup(self.watcher.stop, 5)
+        self.assertTrue(wait_until(lambda: self.watcher._cursor is not None))
+
+    def test_refreshes_only_the_changed_dataset(self):
+        self.dbx.upload("second.csv", b"second v2")
+
+        self.assertTrue(wait_until(lambda: self.registry.version("second") == 1))
+        self.assertEqual(self.registry.get("second", None), "second v2")
+        self.assertEqual(self.registry.version("first"), 0)
+
+        # Files no dataset is built from leave the registry untouched
+        self.dbx.upload("notes.txt", b"notes")
+        self.dbx.upload("first.csv", b"first v2")
+        self.assertTrue(wait_until(lambda: self.registry.version("first") == 1))
+        self.assertEqual(self.registry.version("second"), 1)
+
+    def test_recovers_after_cursor_reset(self):
+        with self.assertLogs(data_tools.logger, "WARNING"):
+            self.dbx.reset_cursors()
+            self.dbx.upload("first.csv", b"first v2")
+            self.assertTrue(wait_until(lambda: self.registry.version("first") == 1))
+        self.assertEqual(self.registry.get("first", None), "first v2")
+        self.assertEqual(self.registry.version("second"), 0)
+
+        # Changes made after the reset are followed through the new cursor
+        self.dbx.upload("second.csv", b"second v2")
+        self.assertTrue(wait_until(lambda: self.registry.version("second") == 1))
+        self.assertEqual(self.registry.version("first"), 1)
+
+    def test_stops_cleanly(self):
+        self.watcher.stop(timeout = 5)
+        self.assertFalse(self.watcher._thread.is_alive())
+
+        # Changes made after stopping are no longer followed
+        self.dbx.upload("first.csv", b"first v2")
+        time.sleep(0.5)
+        self.assertEqual(self.registry.version("first"), 0)
+
+
+def labels_workbook(label):
+    buffer = io.BytesIO()
+    pd.DataFrame({"nuts_id": ["AT13"], "label": [label]}).to_excel(buffer, index = False)
+    return buffer.getvalue()
+
+
+class RegionLabelsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.server    = LocalFileServer({"region_labels.xlsx": labels_workbook("Wien")}).start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        for name, value in {
+            "RLABELS_URL": self.server.url("region_labels.xlsx"),
+            "RLABELS_PATH": os.path.join(self.cache_dir, "region_labels.parquet")
+        }.items():
+            patch = mock.patch.object(data_tools, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_downloads_and_reuses_the_mirror(self):
+        self.assertTrue(data_tools.fetch_rlabels())
+        self.assertEqual(data_tools.read_rlabels()["label"].tolist(), ["Wien"])
+        modified = os.path.getmtime(data_tools.RLABELS_PATH)
+
+        # An unchanged workbook is answered with a 304 and the mirror is left as it is
+        self.assertFalse(data_tools.fetch_rlabels())
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(os.path.getmtime(data_tools.RLABELS_PATH), modified)
+
+        self.server.update("region_labels.xlsx", labels_workbook("Vienna"))
+        self.assertTrue(data_tools.fetch_rlabels())
+        self.assertEqual(data_tools.read_rlabels()["label"].tolist(), ["Vienna"])
+
+    def test_unreachable_server_keeps_the_mirror(self):
+        data_tools.fetch_rlabels()
+        stopped = LocalFileServer().start()
+        stopped.stop()
+
+        with mock.patch.object(data_tools, "RLABELS_URL", stopped.url("region_labels.xlsx")):
+            with self.assertRaises(requests.ConnectionError):
+                data_tools.fetch_rlabels(timeout = 1)
+        self.assertEqual(data_tools.read_rlabels()["label"].tolist(), ["Wien"])
+
+    def test_missing_mirror_does_not_block(self):
+        with self.assertLogs(data_tools.logger, "WARNING"):
+            labels = data_tools.read_rlabels()
+        self.assertTrue(labels.empty)
+        self.assertEqual(self.server.requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
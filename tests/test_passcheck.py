@@ -0,0 +1,65 @@
+"""
+Module Name:    Password Check Tests
+Author:         Carlos Alberto Toruño Paniagua
+Date:           October 18th, 2026
+Description:    Tests of the Dropbox token manager against the local OAuth stand-in.
+This version:   October 18th, 2026
+"""
+import time
+import logging
+import unittest
+from unittest import mock
+from tools import passcheck
+from tools.local_services import LocalOAuthServer
+
+# Refresher threads outlive each test and keep retrying against the stopped servers
+logging.getLogger(passcheck.__name__).setLevel(logging.CRITICAL)
+
+
+class TokenManagerTest(unittest.TestCase):
+
+    def manager(self, server):
+        return passcheck.TokenManager("key", "secret", "refresh", token_url = server.url)
+
+    def test_refreshes_before_expiry(self):
+        with LocalOAuthServer(expires_in = 4) as server:
+            manager = self.manager(server)
+            start   = time.monotonic()
+            self.assertEqual(manager.get_token(), "local-token-1")
+
+            # Tokens shorter than the margin are refreshed halfway through their lifetime
+            time.sleep(3)
+            self.assertEqual(server.requests, 2)
+            self.assertLess(server.issued[1] - start, 4)
+            self.assertEqual(manager.get_token(), "local-token-2")
+
+    def test_min_refresh_wait(self):
+        with mock.patch.object(passcheck, "MIN_REFRESH_WAIT", 0.5):
+            with LocalOAuthServer(expires_in = 0.2) as server:
+                self.manager(server).get_token()
+                time.sleep(2.2)
+                intervals = [b - a for a, b in zip(server.issued, server.issued[1:])]
+
+        self.assertGreaterEqual(len(intervals), 2)
+        self.assertLessEqual(len(intervals), 5)
+        for interval in intervals:
+            self.assertGreaterEqual(interval, 0.45)
+
+    def test_callers_do_not_block(self):
+        with LocalOAuthServer(expires_in = 4) as server:
+            manager = self.manager(server)
+            manager.get_token()
+
+            # The background refresh starts after 2 seconds and takes 1.5 seconds to answer
+            server.delay = 1.5
+            time.sleep(2.5)
+            for _ in range(10):
+                start = time.monotonic()
+                self.assertEqual(manager.get_token(), "local-token-1")
+                self.assertLess(time.monotonic() - start, 0.05)
+            time.sleep(1.5)
+            self.assertEqual(manager.get_token(), "local-token-2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Module Name:    Prep Tools Tests
+Author:         Carlos Alberto Toruño Paniagua
+Date:           October 18th, 2026
+Description:    Tests of the functions preparing the data of the EU Copilot Dashboards.
+This version:   October 18th, 2026
+"""
+import unittest
+import warnings
+import numpy as np
+import pandas as pd
+from tools import prep_tools
+
+DEMOGRAPHICS = ["Total Sample", "Male", "Female"] + [f"Income Quintile {i}" for i in range(1, 6)]
+
+
+def gpp_frame(countries = 27, regions = 8, titles = 120):
+    """
+    Returns a GPP-like frame with a national row (without NUTS name) and several regional rows
+    per country, for every title and demographic group.
+    """
+    units = pd.DataFrame(
+        [
+            (f"Country {c}", "national", f"C{c}", None) for c in range(countries)
+        ] + [
+            (f"Country {c}", "regional", f"C{c}{r}", f"Region {c}-{r}")
+            for c in range(countries) for r in range(regions)
+        ],
+        columns = ["country", "level", "nuts_id", "nuts_ltn"]
+    )
+    indicators = pd.DataFrame({
+        "report":   "Report",
+        "chapter":  [f"Chapter {t % 5}" for t in range(titles)],
+        "section":  [f"Section {t % 10}" for t in range(titles)],
+        "title":    [f"Title {t}" for t in range(titles)],
+        "subtitle": [f"Subtitle {t}" for t in range(titles)]
+    })
+    df = (
+        units
+        .merge(indicators, how = "cross")
+        .merge(pd.DataFrame({"demographic": DEMOGRAPHICS}), how = "cross")
+    )
+    df["value2plot"] = np.random.default_rng(0).random(len(df)).astype("float32") * 100
+    dimensions = df.columns.drop("value2plot")
+    return df.astype({col: "category" for col in dimensions})
+
+
+class DemographicGapsTest(unittest.TestCase):
+
+    def test_realistic_size(self):
+        df   = gpp_frame()
+        gaps = prep_tools.demographic_gaps(df)
+
+        self.assertEqual(len(df), 27 * 9 * 120 * 8)
+        self.assertEqual(len(gaps), 2 * 120 * 2)
+        national = gaps[("Income", "Report", "Chapter 0", "Section 0", "Title 0", "national")]
+        regional = gaps[("Gender", "Report", "Chapter 0", "Section 0", "Title 0", "regional")]
+        self.assertEqual(len(national), 27)
+        self.assertEqual(len(regional), 27 * 8)
+        self.assertTrue(national["nuts_ltn"].isna().all())
+
+    def test_gap_values(self):
+        df   = gpp_frame(countries = 1, regions = 1, titles = 1)
+        gaps = prep_tools.demographic_gaps(df)
+
+        table = gaps[("Gender", "Report", "Chapter 0", "Section 0", "Title 0", "national")]
+        rows  = df.loc[(df["level"] == "national")].set_index("demographic")["value2plot"]
+        self.assertAlmostEqual(table["difference"].iloc[0], abs(rows["Male"] - rows["Female"]), places = 4)
+
+
+class OlsFitsTest(unittest.TestCase):
+
+    def test_matches_pairwise_fits(self):
+        rng = np.random.default_rng(0)
+        x   = pd.DataFrame(rng.random((40, 3)) * 100, columns = ["a", "b", "c"])
+        y   = x * 0.5 + rng.random((40, 3))
+        x.iloc[rng.integers(0, 40, 10), 0] = np.nan
+        y.iloc[rng.integers(0, 40, 10), 2] = np.nan
+        fits = prep_tools.ols_fits(x, y)
+
+        for xcol in x.columns:
+            for ycol in y.columns:
+                rows = x[xcol].notna() & y[ycol].notna()
+                slope, intercept = np.polyfit(x.loc[rows, xcol], y.loc[rows, ycol], 1)
+                self.assertAlmostEqual(fits.slope.loc[xcol, ycol], slope, places = 6)
+                self.assertAlmostEqual(fits.intercept.loc[xcol, ycol], intercept, places = 6)
+
+    def test_degenerate_pairs(self):
+        # The one-pass sum of squares of this constant column leaves a small positive residue
+        x = pd.DataFrame({
+            "constant": [0.3] * 27,
+            "single":   [np.nan] * 26 + [2.0],
+            "empty":    [np.nan] * 27
+        })
+        y = pd.DataFrame({"y": np.arange(27, dtype = "float64")})
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            fits = prep_tools.ols_fits(x, y)
+
+        for field in fits:
+            self.assertTrue(field.isna().all().all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Module Name:    Viz Tools Tests
+Author:         Carlos Alberto Toruño Paniagua
+Date:           October 18th, 2026
+Description:    Tests of the figure cache shared by the chart builders of the EU Copilot Dashboards.
+This version:   October 18th, 2026
+"""
+import json
+import unittest
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from tools import viz_tools
+
+
+class FigureCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = viz_tools.FigureCache(max_bytes = 250)
+        for key in ["a", "b"]:
+            cache.put(key, "x" * 100)
+        cache.get("a")
+        cache.put("c", "x" * 100)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 1, 1))
+        self.assertEqual((stats["entries"], stats["bytes"]), (2, 200))
+
+    def test_logs_statistics(self):
+        cache = viz_tools.FigureCache(log_interval = 0)
+        with self.assertLogs(viz_tools.logger, "INFO") as logs:
+            cache.get("a")
+        self.assertIn("0 hits, 1 misses", logs.output[0])
+
+    def test_cached_builder(self):
+        calls = []
+
+        @viz_tools.cached_figure
+        def builder(data, size, options):
+            calls.append(size)
+            return go.Figure(go.Bar(x = data["x"], y = [size] * len(data)))
+
+        data = pd.DataFrame({"x": [1, 2]})
+        first  = builder(data, np.int64(2), {"b": 1, "a": 2})
+        second = builder(data.copy(), 2, {"a": 2, "b": 1})
+        third  = builder(data, 2, object())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(json.loads(first.to_json()), json.loads(second.to_json()))
+        self.assertEqual(third.data[0].y, (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
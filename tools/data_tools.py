@@ -0,0 +1,943 @@
+"""
+Module Name:    Data Tools
+Author:         Carlos Alberto Toruño Paniagua
+Date:           October 18th, 2026
+Description:    This module contains all the functions and classes to be used by the EU Copilot
+                Dashboards for loading data stored in Dropbox.
+This version:   October 18th, 2026
+"""
+import io
+import os
+import contextlib
+import json
+import hashlib
+import tempfile
+import threading
+import time
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import geopandas as gpd
+import shapely
+import shapely.ops
+import requests
+import streamlit as st
+import dropbox
+import dropbox.files
+import dropbox.exceptions
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import fcntl
+except ImportError:
+    # Windows: the cross-process locks are taken with msvcrt instead
+    fcntl = None
+    import msvcrt
+from tools import passcheck
+
+logger = logging.getLogger(__name__)
+
+# Local directory where the raw Dropbox files, and the mirror of the region labels, are cached
+# between app restarts
+CACHE_DIR = os.environ.get("EUCOPILOT_CACHE_DIR", ".cache/dropbox")
+
+# Size of the pieces in which files are downloaded (bytes) and CSV files are parsed (rows)
+DOWNLOAD_CHUNK = 1024 * 1024
+CSV_CHUNK_ROWS = 100000
+
+# Inputs used by the dashboard pages, warmed up by prefetch_datasets()
+A2J_WORKBOOK = "A2J_justicejourney_wrangled.xlsx"
+A2J_SHEETS   = [f"Section{i}" for i in range(1,7)]
+OUTLINE_FILE = "report_outline.xlsx"
+RLABELS_URL  = "https://github.com/WJP-DAU/eu-gpp-report/raw/main/data-viz/inputs/region_labels.xlsx"
+RLABELS_PATH = os.path.join(CACHE_DIR, "region_labels.parquet")
+MLAYER_PATH  = "inputs/EU_base_map.geojson"
+
+# Seconds between the conditional checks for a new version of the region labels, and between
+# the attempts to fetch them while there is no local copy
+RLABELS_REFRESH = 6 * 60 * 60
+RLABELS_RETRY   = 5 * 60
+
+# Simplification tolerance (degrees) and coordinate decimals of the map layers built for the
+# choropleth maps, by resolution
+MAP_RESOLUTIONS = {
+    "high":   (0.001, 4),
+    "medium": (0.005, 3),
+    "low":    (0.02, 2)
+}
+# Bumped whenever the layers built by build_map_layers() change, so older layers are rebuilt
+MAP_LAYER_FORMAT = 1
+
+
+def _cache_paths(file):
+    """
+    Returns the local paths of the cached copy of a Dropbox file and of its metadata record.
+    """
+    blob_path = os.path.join(CACHE_DIR, file)
+    meta_path = f"{blob_path}.meta.json"
+    return blob_path, meta_path
+
+
+def _read_cache_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache_meta(meta_path, meta):
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(meta_path) or ".")
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+# Concurrent fetches of the same file wait for each other, so the file is downloaded only once
+_fetch_locks      = {}
+_fetch_locks_lock = threading.Lock()
+
+
+def fetch_DBfile(dbx, file):
+    """
+    This function returns the local path to an up-to-date copy of a file stored in Dropbox. The
+    copy is kept on disk and keyed by the Dropbox content hash of the file, so the file is only
+    downloaded when it changed upstream. Otherwise, a single metadata call is made.
+
+    Parameters:
+    dbx:        Dropbox client object.
+    file:       String. Name of the file in the root of the Dropbox app folder.
+
+    Returns:
+    str:        Local path to the cached copy of the file.
+    """
+    blob_path, meta_path = _cache_paths(file)
+    with _fetch_locks_lock:
+        lock = _fetch_locks.setdefault(file, threading.Lock())
+
+    with lock:
+        metadata = dbx.files_get_metadata(f"/{file}")
+        cached   = _read_cache_meta(meta_path)
+
+        if cached.get("content_hash") == metadata.content_hash and os.path.exists(blob_path):
+            return blob_path
+
+        # Streaming the download into a temporary file first so readers never see a partial copy
+        os.makedirs(os.path.dirname(blob_path), exist_ok = True)
+        _, res = dbx.files_download(f"/{file}", rev = metadata.rev)
+        fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(blob_path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in res.iter_content(chunk_size = DOWNLOAD_CHUNK):
+                    f.write(chunk)
+        finally:
+            res.close()
+        os.replace(tmp_path, blob_path)
+
+        # The metadata is replaced after the file, so it never records a hash the file lacks
+        _write_cache_meta(meta_path, {"rev": metadata.rev, "content_hash": metadata.content_hash})
+
+    return blob_path
+
+
+def read_DBsheets(dbx, file, sheets):
+    """
+    This function reads several sheets of an Excel workbook stored in Dropbox. The workbook is
+    fetched once and all the requested sheets are parsed while it is opened a single time.
+
+    Parameters:
+    dbx:        Dropbox client object.
+    file:       String. Name of the workbook in the root of the Dropbox app folder.
+    sheets:     List of sheet names to read.
+
+    Returns:
+    dict:       Dictionary with sheet names as keys and Pandas Data Frames as values.
+    """
+    path = fetch_DBfile(dbx, file)
+    dfs  = pd.read_excel(path, sheet_name = list(sheets))
+    return dfs
+
+
+# Columnar snapshots of the dashboard data: upstream file, column renames and outline join
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+SNAPSHOTS    = {
+    "gpp": {
+        "file": "data4web_gpp.csv",
+        "rename": {
+            'chapter': 'report',
+            'section': 'chapter',
+            'subsection': 'section',
+            'value': 'value2plot'
+        },
+        "drop": ["direction"],
+        "copy": {},
+        "join_on": ["title"],
+        "outline": ["title", "direction", "reportValue"]
+    },
+    "qrq": {
+        "file": "data4web_qrq.csv",
+        "rename": {
+            'theme': 'report',
+            'pillar_name': 'chapter',
+            'subpillar_name': 'title',
+            'score': 'value2plot'
+        },
+        "drop": [],
+        "copy": {"section": "title"},
+        "join_on": ["title", "subtitle"],
+        "outline": ["title", "subtitle", "direction", "reportValue"]
+    }
+}
+
+# Bumped whenever the columns derived in build_snapshots() change, so older snapshots are rebuilt
+SNAPSHOT_FORMAT = 3
+
+# Columns stored as dictionary-encoded categoricals, with the same categories across datasets
+DIMENSIONS = [
+    "country", "nuts_id", "nuts_ltn", "level", "demographic", "report", "chapter", "section",
+    "title", "subtitle", "direction", "reportValue", "id", "indicator", "category", "adviser"
+]
+
+# Columns of the A2J workbook holding a dimension under another name
+DIMENSION_ALIASES = {"country_name_ltn": "country"}
+
+# Upstream files the categories of the dimensions are drawn from
+SCHEMA_FILES = [SNAPSHOTS["gpp"]["file"], SNAPSHOTS["qrq"]["file"], OUTLINE_FILE, A2J_WORKBOOK]
+
+
+def compact_frame(df, categories = None):
+    """
+    This function casts the dimension columns of a data frame to categoricals and its float
+    columns to float32.
+
+    Parameters:
+    df:         Pandas Data Frame.
+    categories: Optional dictionary with the categories of each dimension, as returned by
+                shared_categories(). Otherwise, each column keeps its own categories.
+
+    Returns:
+    DataFrame:  Pandas Data Frame with the compact column types.
+    """
+    dtypes = {}
+    for col in df.columns:
+        dimension = DIMENSION_ALIASES.get(col, col)
+        if dimension in DIMENSIONS:
+            dtypes[col] = (
+                "category" if categories is None else pd.CategoricalDtype(categories[dimension])
+            )
+    # Dimensions left empty in a chunk are parsed as floats, but they keep their categorical type
+    floats = df.select_dtypes("float64").columns
+    dtypes.update({col: "float32" for col in floats if col not in dtypes})
+    return df.astype(dtypes)
+
+
+def shared_categories(frames):
+    """
+    This function collects the values of every dimension across several data frames, so that
+    all of them can be encoded with the same categories. Sharing the categories keeps columns
+    categorical when frames from different datasets are concatenated or merged.
+
+    Parameters:
+    frames:     List of Pandas Data Frames.
+
+    Returns:
+    dict:       Dictionary with the dimension names as keys and the sorted list of their values.
+    """
+    values = {dimension: set() for dimension in DIMENSIONS}
+    for df in frames:
+        for col in df.columns:
+            dimension = DIMENSION_ALIASES.get(col, col)
+            if dimension in values:
+                column = df[col]
+                if isinstance(column.dtype, pd.CategoricalDtype):
+                    values[dimension].update(column.cat.categories.tolist())
+                else:
+                    values[dimension].update(column.dropna().unique().tolist())
+    categories = {}
+    for dimension, found in values.items():
+        try:
+            categories[dimension] = sorted(found)
+        except TypeError:
+            categories[dimension] = sorted(found, key = str)
+    return categories
+
+
+def realign_values(values, directions, scale = 1):
+    """
+    This function flips the values of the indicators with a negative direction, so that higher
+    values are always the better outcome across indicators.
+
+    Parameters:
+    values:     Series with the values to realign.
+    directions: Series with the direction of each value, either 'positive' or 'negative'.
+    scale:      Maximum of the scale the values are expressed in (1 for shares, 100 for percentages).
+
+    Returns:
+    Series:     Series with the realigned values.
+    """
+    negative  = (directions == "negative").to_numpy()
+    realigned = np.where(negative, scale - values.to_numpy(), values.to_numpy())
+    return pd.Series(realigned, index = values.index, name = "value_realign")
+
+
+def read_csv_chunked(path, prepare = None, dimensions = (), chunksize = CSV_CHUNK_ROWS):
+    """
+    This function reads a CSV file in chunks of rows from a memory-mapped file. Each chunk is
+    compacted as soon as it is parsed, so the peak memory is bounded by the chunk size plus the
+    compact frame instead of the full object-typed frame. Dimensions are always parsed as strings,
+    so their type does not depend on the values found in each chunk.
+
+    Parameters:
+    path:       String. Local path to the CSV file.
+    prepare:    Optional function applied to every chunk before compacting it.
+    dimensions: Additional columns of the file parsed as dimensions, such as the columns renamed
+                to a dimension by prepare.
+    chunksize:  Integer. Number of rows parsed at a time.
+
+    Returns:
+    DataFrame:  Compact Pandas Data Frame with the contents of the file.
+    """
+    chunks = []
+    dtype  = {col: "string" for col in [*DIMENSIONS, *dimensions]}
+    with pd.read_csv(path, chunksize = chunksize, memory_map = True, dtype = dtype) as reader:
+        for chunk in reader:
+            if prepare is not None:
+                chunk = prepare(chunk)
+            chunks.append(compact_frame(chunk))
+
+    # Sharing the categories across chunks so the concatenated columns stay categorical
+    for col in chunks[0].select_dtypes("category").columns:
+        categories = sorted(set().union(*[chunk[col].cat.categories for chunk in chunks]))
+        for i, chunk in enumerate(chunks):
+            chunks[i] = chunk.assign(**{col: chunk[col].cat.set_categories(categories)})
+    df = pd.concat(chunks, ignore_index = True)
+    return df
+
+
+# Snapshots are built together, concurrent loaders wait for the build in progress
+_snapshot_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _snapshot_file_lock():
+    """
+    Holds an exclusive lock on a file in SNAPSHOT_DIR, so processes sharing the cache (such as
+    several replicas on the same host) write and clean up the snapshots and map layers one at a
+    time.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok = True)
+    with open(os.path.join(SNAPSHOT_DIR, ".lock"), "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            # msvcrt locks a byte range and gives up after ten seconds, so it is retried
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_arrow(df, path):
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(path))
+    os.close(fd)
+    table = pa.Table.from_pandas(df, preserve_index = False)
+
+    # Keeping missing values as NaN instead of Arrow nulls, and the whole table in a single record
+    # batch, so the float columns can later be viewed straight from the mapped file
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type):
+            table = table.set_column(i, field, pa.array(df[field.name].to_numpy(), from_pandas = False))
+    feather.write_feather(
+        table, tmp_path, compression = "uncompressed", chunksize = max(table.num_rows, 1)
+    )
+    os.replace(tmp_path, path)
+
+
+def build_snapshots(dbx):
+    """
+    This function turns the upstream data4web files into typed columnar snapshots stored as
+    uncompressed Arrow IPC (Feather v2) files. The columns are renamed to the names used by the
+    dashboards, the report outline is joined in, the values are realigned by direction, and values
+    are stored as float32. Dimensions are dictionary-encoded with categories shared with the A2J
+    workbook, which are saved next to the snapshots as a schema file. Snapshots are keyed by the
+    content hashes of their inputs, so they are only rebuilt when the upstream files change.
+
+    Parameters:
+    dbx:        Dropbox client object.
+
+    Returns:
+    dict:       Dictionary with the local paths to the Arrow snapshot of every entry of SNAPSHOTS
+                and to the schema file (under 'schema').
+    """
+    paths  = {file: fetch_DBfile(dbx, file) for file in SCHEMA_FILES}
+    hashes = [_read_cache_meta(_cache_paths(file)[1]).get("content_hash", "") for file in SCHEMA_FILES]
+    version   = hashlib.sha1(f"{SNAPSHOT_FORMAT}{''.join(hashes)}".encode()).hexdigest()[:16]
+    snapshots = {name: os.path.join(SNAPSHOT_DIR, f"{name}-{version}.arrow") for name in SNAPSHOTS}
+    snapshots["schema"] = os.path.join(SNAPSHOT_DIR, f"schema-{version}.json")
+
+    with _snapshot_lock, _snapshot_file_lock():
+        if all(os.path.exists(path) for path in snapshots.values()):
+            return snapshots
+
+        # Renaming columns and joining the report outline, one chunk of rows at a time
+        outline = pd.read_excel(paths[OUTLINE_FILE])
+        frames  = {}
+        for name, spec in SNAPSHOTS.items():
+
+            def prepare_chunk(chunk, spec = spec):
+                chunk = chunk.drop(columns = [col for col in spec["drop"] if col in chunk.columns])
+                chunk = chunk.rename(columns = spec["rename"])
+                for target, origin in spec["copy"].items():
+                    chunk[target] = chunk[origin]
+                chunk = pd.merge(chunk, outline[spec["outline"]], on = spec["join_on"], how = "left")
+                chunk["value_realign"] = realign_values(chunk["value2plot"], chunk["direction"])
+                return chunk
+
+            renamed      = [col for col, target in spec["rename"].items() if target in DIMENSIONS]
+            frames[name] = read_csv_chunked(paths[spec["file"]], prepare_chunk, renamed)
+
+        workbook   = pd.read_excel(paths[A2J_WORKBOOK], sheet_name = A2J_SHEETS)
+        categories = shared_categories(list(frames.values()) + list(workbook.values()))
+
+        for name, df in frames.items():
+            _write_arrow(compact_frame(df, categories), snapshots[name])
+        with open(snapshots["schema"], "w") as f:
+            json.dump(categories, f)
+
+        # Removing outdated snapshots, processes still mapping them keep their copy. Temporary
+        # files are left alone, as they may belong to a build in progress elsewhere
+        current = {os.path.basename(path) for path in snapshots.values()}
+        for file in os.listdir(SNAPSHOT_DIR):
+            snapshot = file.endswith(".arrow") or (file.startswith("schema-") and file.endswith(".json"))
+            if snapshot and file not in current:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(SNAPSHOT_DIR, file))
+
+    return snapshots
+
+
+def read_snapshot(dbx, name):
+    """
+    This function reads the columnar snapshot of a dashboard dataset, building it first if the
+    upstream files changed. The file is memory-mapped and the columns are views over the mapping,
+    so every Streamlit process on the host shares the same pages of the OS cache instead of
+    holding its own parsed copy.
+    """
+    table = feather.read_table(build_snapshots(dbx)[name], memory_map = True)
+    df    = table.to_pandas(split_blocks = True)
+    return df
+
+
+def read_a2j(dbx):
+    """
+    This function reads the sheets of the A2J workbook, with their dimensions encoded with the
+    same categories as the GPP and QRQ snapshots and their values stored as float32.
+    """
+    with open(build_snapshots(dbx)["schema"]) as f:
+        categories = json.load(f)
+    sheets = read_DBsheets(dbx, A2J_WORKBOOK, A2J_SHEETS)
+    return {sheet: compact_frame(df, categories) for sheet, df in sheets.items()}
+
+
+def fetch_rlabels(timeout = 30):
+    """
+    This function updates the local mirror of the region labels from GitHub. The request is
+    conditional on the ETag and Last-Modified values of the current copy, so the workbook is only
+    downloaded and parsed when it changed upstream.
+
+    Parameters:
+    timeout:    Seconds to wait for the server before giving up.
+
+    Returns:
+    bool:       True if the local copy was updated, False if it was already current.
+    """
+    meta_path = f"{RLABELS_PATH}.meta.json"
+    cached    = _read_cache_meta(meta_path) if os.path.exists(RLABELS_PATH) else {}
+    headers   = {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    res = requests.get(RLABELS_URL, headers = headers, timeout = timeout)
+    if res.status_code == 304:
+        return False
+    res.raise_for_status()
+
+    df = pd.read_excel(io.BytesIO(res.content))
+    os.makedirs(os.path.dirname(RLABELS_PATH), exist_ok = True)
+    fd, tmp_path = tempfile.mkstemp(dir = os.path.dirname(RLABELS_PATH), suffix = ".parquet")
+    os.close(fd)
+    df.to_parquet(tmp_path, index = False)
+    os.replace(tmp_path, RLABELS_PATH)
+
+    _write_cache_meta(meta_path, {
+        "etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified")
+    })
+    return True
+
+
+def read_rlabels():
+    """
+    Reads the region labels from their local mirror. Startup never waits for GitHub: while the
+    mirror is missing, an empty table is returned and the labels are filled in by mirror_rlabels()
+    once they are fetched in the background.
+    """
+    if not os.path.exists(RLABELS_PATH):
+        logger.warning("Region labels are not mirrored yet, starting without them")
+        return pd.DataFrame()
+    df = pd.read_parquet(RLABELS_PATH)
+    return df
+
+
+def mirror_rlabels(registry, interval = RLABELS_REFRESH):
+    """
+    Loop run on a background thread that keeps the local mirror of the region labels current.
+    A failed check leaves the local copy in place and is retried on the next cycle.
+    """
+    while True:
+        try:
+            if fetch_rlabels() and registry.loaded("region_labels"):
+                registry.put("region_labels", read_rlabels())
+                logger.info("Refreshed dataset region_labels")
+        except Exception:
+            logger.warning("Region labels could not be refreshed, keeping the local copy", exc_info = True)
+        time.sleep(interval if os.path.exists(RLABELS_PATH) else min(interval, RLABELS_RETRY))
+
+
+def shared_arcs(geoms):
+    """
+    Returns the boundaries of a set of regions split into arcs between junctions, so every border
+    shared by two regions is a single arc.
+    """
+    return shapely.get_parts(shapely.ops.linemerge(shapely.union_all(shapely.boundary(geoms))))
+
+
+def simplify_layer(layer, tolerance, decimals, arcs = None):
+    """
+    This function simplifies the regions of a map layer while preserving the borders they share:
+    the boundaries are split into arcs between junctions, every arc is simplified once and
+    snapped to a grid of the given decimals, and the regions are rebuilt from the faces formed by
+    the arcs. Neighbouring regions therefore keep exactly the same border, without gaps or
+    overlaps.
+
+    Parameters:
+    layer:      GeoDataFrame with the regions, identified by the polID column.
+    tolerance:  Float with the simplification tolerance, in the units of the layer.
+    decimals:   Integer with the number of decimals kept in the coordinates.
+    arcs:       Array with the arcs of the layer, as returned by shared_arcs(). Computed from the
+                layer if not provided.
+
+    Returns:
+    GeoDataFrame:   GeoDataFrame with the polID and the simplified geometry of every region.
+    """
+    geoms = shapely.make_valid(layer.geometry.values.to_numpy())
+    grid  = 10.0 ** -decimals
+    if arcs is None:
+        arcs = shared_arcs(geoms)
+
+    arcs  = shapely.set_precision(shapely.simplify(arcs, tolerance, preserve_topology = True), grid)
+    faces = shapely.get_parts(shapely.polygonize(shapely.get_parts(shapely.union_all(arcs))))
+
+    # Each face goes to the region containing a point of its interior, faces outside every region
+    # (seas enclosed by the borders) are dropped
+    face_idx, geom_idx = shapely.STRtree(geoms).query(
+        shapely.point_on_surface(faces), predicate = "within"
+    )
+    matches = pd.DataFrame({"face": face_idx, "region": geom_idx}).drop_duplicates("face")
+
+    regions = np.full(len(geoms), None, dtype = object)
+    for region, group in matches.groupby("region"):
+        regions[region] = shapely.union_all(faces[group["face"].to_numpy()])
+
+    # Regions collapsed by the simplification (small islands) are simplified on their own
+    missing = np.array([region is None or region.is_empty for region in regions])
+    if missing.any():
+        regions[missing] = shapely.set_precision(
+            shapely.simplify(geoms[missing], tolerance, preserve_topology = True), grid
+        )
+
+    return gpd.GeoDataFrame(
+        {"polID": layer["polID"].to_numpy()}, geometry = regions, crs = layer.crs
+    )
+
+
+def _orient(geom):
+    """Orients the exterior rings of a (multi)polygon counter-clockwise, as GeoJSON expects."""
+    if geom.geom_type == "MultiPolygon":
+        return shapely.MultiPolygon([shapely.geometry.polygon.orient(part) for part in geom.geoms])
+    if geom.geom_type == "Polygon":
+        return shapely.geometry.polygon.orient(geom)
+    return geom
+
+
+def _round_coords(coords, decimals):
+    if isinstance(coords[0], (int, float)):
+        return [round(value, decimals) for value in coords]
+    return [_round_coords(part, decimals) for part in coords]
+
+
+def layer_geojson(layer, decimals):
+    """
+    Returns a map layer as a GeoJSON dictionary keeping only the polID of every region, with the
+    coordinates rounded to the given decimals. Regions collapsed by the simplification are left
+    out.
+    """
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"polID": pol_id},
+                "geometry": {
+                    "type": geometry["type"],
+                    "coordinates": _round_coords(geometry["coordinates"], decimals)
+                }
+            }
+            for pol_id, geometry in (
+                (pol_id, shapely.geometry.mapping(_orient(geom)))
+                for pol_id, geom in zip(layer["polID"], layer.geometry)
+                if geom is not None and not geom.is_empty
+            )
+        ]
+    }
+
+
+class MapLayers(dict):
+    """
+    Dictionary of the map layers of every resolution, carrying the digest of the source file and
+    settings they were built from, so they can be told apart by content without hashing them.
+    """
+
+    def __init__(self, layers, digest):
+        super().__init__(layers)
+        self.digest = digest
+
+
+def build_map_layers(path = None):
+    """
+    This function builds the map layer of every resolution in MAP_RESOLUTIONS from the full NUTS
+    geometry. The layers are written to the local cache, keyed by the content of the source
+    file, the resolution settings and MAP_LAYER_FORMAT, so they are only rebuilt when any of
+    them changes.
+
+    Parameters:
+    path:       String with the path of the full map layer. Defaults to MLAYER_PATH.
+
+    Returns:
+    MapLayers:  Dictionary with the resolution names as keys and GeoJSON dictionaries as values.
+    """
+    path = path or MLAYER_PATH
+    with open(path, "rb") as source:
+        digest = hashlib.sha256(source.read())
+    digest.update(json.dumps([MAP_RESOLUTIONS, MAP_LAYER_FORMAT], sort_keys = True).encode())
+    version = digest.hexdigest()[:16]
+    target  = os.path.join(CACHE_DIR, f"map_layers-{version}.json")
+
+    if os.path.exists(target):
+        with open(target) as cached:
+            return MapLayers(json.load(cached), version)
+
+    layer  = gpd.read_file(path).to_crs(epsg=4326)
+    arcs   = shared_arcs(shapely.make_valid(layer.geometry.values.to_numpy()))
+    layers = {
+        resolution: layer_geojson(simplify_layer(layer, tolerance, decimals, arcs), decimals)
+        for resolution, (tolerance, decimals) in MAP_RESOLUTIONS.items()
+    }
+
+    # Writing and cleaning up under the same lock as the snapshots, as replicas may be doing the same
+    os.makedirs(CACHE_DIR, exist_ok = True)
+    with _snapshot_file_lock():
+        with tempfile.NamedTemporaryFile("w", dir = CACHE_DIR, delete = False, suffix = ".tmp") as tmp:
+            json.dump(layers, tmp, separators = (",", ":"))
+        os.replace(tmp.name, target)
+
+        for file in os.listdir(CACHE_DIR):
+            outdated = file.startswith("map_layers-") and file != os.path.basename(target)
+            if outdated and file.endswith(".json"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(CACHE_DIR, file))
+    return MapLayers(layers, version)
+
+
+def read_mlayer():
+    return build_map_layers()
+
+
+class DatasetRegistry:
+    """
+    Process-wide store holding a single copy of each dashboard dataset. Every page and session
+    receives the same object, without the copies made by st.cache_data on each cache hit, so the
+    datasets must be treated as read-only by their callers (the dashboard pages enable pandas
+    copy-on-write, so frames derived from them never write back into the shared copy).
+    """
+
+    def __init__(self):
+        self._datasets = {}
+        self._versions = {}
+        self._locks    = {}
+        self._lock     = threading.Lock()
+
+    def get(self, name, loader, *args):
+        """Returns the dataset, loading it once with loader(*args) if it is not registered yet."""
+        if name in self._datasets:
+            return self._datasets[name]
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._datasets:
+                self._datasets[name] = loader(*args)
+            return self._datasets[name]
+
+    def put(self, name, dataset):
+        """Registers a new version of a dataset, replacing the previous one in a single step."""
+        self._datasets[name] = dataset
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def loaded(self, name):
+        return name in self._datasets
+
+    def version(self, name):
+        """Returns a counter increased every time a new version of the dataset is registered."""
+        return self._versions.get(name, 0)
+
+
+registry = DatasetRegistry()
+
+# Loaders of every dataset held in the registry
+DATASET_LOADERS = {
+    "gpp": lambda dbx: read_snapshot(dbx, "gpp"),
+    "qrq": lambda dbx: read_snapshot(dbx, "qrq"),
+    "a2j": lambda dbx: read_a2j(dbx),
+    "region_labels": lambda dbx: read_rlabels(),
+    "map_layer": lambda dbx: read_mlayer()
+}
+
+# Dropbox files each registered dataset is built from (the categories of the dimensions are
+# shared, so a change in any of them rebuilds all three)
+DATASET_SOURCES = {
+    "gpp": SCHEMA_FILES,
+    "qrq": SCHEMA_FILES,
+    "a2j": SCHEMA_FILES
+}
+
+
+def get_dataset(dbx, name):
+    """
+    This function returns the shared, read-only copy of a dashboard dataset held in the
+    process-wide registry, loading it on first use.
+
+    Parameters:
+    dbx:        Dropbox client object.
+    name:       String. Name of the dataset, as listed in DATASET_LOADERS.
+
+    Returns:
+    DataFrame:  Shared Pandas Data Frame (or dictionary of Data Frames for workbooks).
+    """
+    dataset = registry.get(name, DATASET_LOADERS[name], dbx)
+    return dataset
+
+
+# Dimensions identifying a single indicator view in the dashboards
+CUBE_KEYS = ["report", "chapter", "section", "title", "level", "demographic"]
+
+
+class IndicatorCube:
+    """
+    Read-only index of a dashboard dataset by indicator. The row positions of every combination of
+    the CUBE_KEYS present in the data are computed once, so each view is a dictionary lookup
+    followed by a take of its own rows, instead of a chain of boolean masks over the full frame.
+    Views are sliced on first use and then shared, callers must not modify them in place.
+
+    Parameters:
+    df:         Pandas Data Frame to index.
+    keys:       List of columns identifying a view. Columns missing from df are skipped.
+    """
+
+    def __init__(self, df, keys = CUBE_KEYS):
+        self.df    = df
+        self.keys  = [key for key in keys if key in df.columns]
+        self._rows = df.groupby(self.keys, observed = True, sort = False).indices
+        self._first_rows = df.groupby("title", observed = True, sort = False).indices
+        self._views = {}
+        self._lock  = threading.Lock()
+
+    def view(self, **selection):
+        """
+        Returns the rows matching a value for every key of the cube, in their original order.
+        """
+        key = tuple(selection[name] for name in self.keys)
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = self.df.take(self._rows.get(key, []))
+            return self._views[key]
+
+    def describe(self, title):
+        """Returns the first row of an indicator, holding its subtitle, direction and report value."""
+        return self.df.iloc[self._first_rows[title][0]]
+
+
+@st.cache_resource(show_spinner = False)
+def prefetch_datasets(_dbx):
+    """
+    This function downloads and parses every dashboard dataset concurrently on a thread pool,
+    filling the shared dataset registry. It runs once per process and does not wait for the
+    downloads to finish.
+
+    Parameters:
+    dbx:        Dropbox client object.
+
+    Returns:
+    dict:       Dictionary with the name of each dataset as keys and its Future as values.
+    """
+    executor = ThreadPoolExecutor(max_workers = 6, thread_name_prefix = "prefetch")
+    futures  = {
+        name: executor.submit(get_dataset, _dbx, name) for name in DATASET_LOADERS
+    }
+    executor.shutdown(wait = False)
+    return futures
+
+
+def connect_DB():
+    """
+    Returns a Dropbox client authenticated with the app secrets and the shared access token.
+    """
+    atoken = passcheck.retrieve_DBtoken(st.secrets["app_key"], st.secrets["app_secret"], st.secrets["dbtoken"])
+    return dropbox.Dropbox(atoken)
+
+
+def _is_cursor_reset(error):
+    """Returns True for the errors Dropbox raises when a list_folder cursor is no longer valid."""
+    return (
+        isinstance(error, dropbox.exceptions.ApiError)
+        and isinstance(
+            error.error, (dropbox.files.ListFolderContinueError, dropbox.files.ListFolderLongpollError)
+        )
+        and error.error.is_reset()
+    )
+
+
+class DropboxWatcher:
+    """
+    Background thread following the changes in the Dropbox app folder through a list_folder cursor
+    and long polling. When a file changes, only the datasets built from it are reloaded (which
+    downloads the new file and rebuilds its snapshot) and then swapped into the registry, so
+    readers keep getting the previous version until the new one is ready. If Dropbox resets the
+    cursor, the watcher starts again from the latest cursor and compares the content hash of every
+    source file with its local copy, so changes made in between are not missed.
+
+    Parameters:
+    connect:        Callable returning a Dropbox client. It is called again on every cycle so the
+                    client always carries a valid access token.
+    registry:       DatasetRegistry to refresh.
+    poll_timeout:   Seconds each long poll waits for changes.
+    """
+
+    def __init__(self, connect, registry, poll_timeout = 30):
+        self.connect      = connect
+        self.registry     = registry
+        self.poll_timeout = poll_timeout
+        self._cursor      = None
+        self._resync      = False
+        self._stop        = threading.Event()
+        self._thread      = None
+
+    def start(self):
+        self._thread = threading.Thread(target = self._run, daemon = True, name = "dropbox-watcher")
+        self._thread.start()
+        return self
+
+    def stop(self, timeout = None):
+        """Stops the watcher, waiting up to timeout seconds for the poll in progress to end."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._cursor is None:
+                    self._cursor = self.connect().files_list_folder_get_latest_cursor("").cursor
+                if self._resync:
+                    self.resync(self.connect())
+                    self._resync = False
+                self.poll()
+            except Exception as error:
+                if _is_cursor_reset(error):
+                    logger.warning("Dropbox cursor was reset, resynchronising the datasets")
+                    self._cursor = None
+                    self._resync = True
+                    continue
+                logger.exception("Dropbox watcher failed, retrying")
+                self._stop.wait(self.poll_timeout)
+
+    def poll(self):
+        """Waits for changes in the app folder and refreshes the datasets affected by them."""
+        dbx    = self.connect()
+        result = dbx.files_list_folder_longpoll(self._cursor, timeout = self.poll_timeout)
+        if result.changes:
+            changed = set()
+            listing = dbx.files_list_folder_continue(self._cursor)
+            while True:
+                changed.update(
+                    entry.name for entry in listing.entries
+                    if isinstance(entry, dropbox.files.FileMetadata)
+                )
+                if not listing.has_more:
+                    break
+                listing = dbx.files_list_folder_continue(listing.cursor)
+            self._cursor = listing.cursor
+            for file in changed:
+                self.refresh(dbx, file)
+        if result.backoff:
+            self._stop.wait(result.backoff)
+
+    def resync(self, dbx):
+        """Refreshes the registered datasets whose files no longer match their local copy."""
+        files = {
+            file for name, files in DATASET_SOURCES.items() if self.registry.loaded(name)
+            for file in files
+        }
+        for file in sorted(files):
+            cached = _read_cache_meta(_cache_paths(file)[1])
+            if cached.get("content_hash") != dbx.files_get_metadata(f"/{file}").content_hash:
+                self.refresh(dbx, file)
+
+    def refresh(self, dbx, file):
+        """Reloads the registered datasets built from a changed Dropbox file."""
+        affected = [name for name, files in DATASET_SOURCES.items() if file in files]
+        if not affected:
+            return
+
+        # Downloading the new version once, the loaders below read it from the local copy
+        fetch_DBfile(dbx, file)
+        for name in affected:
+            if self.registry.loaded(name):
+                self.registry.put(name, DATASET_LOADERS[name](dbx))
+                logger.info("Refreshed dataset %s after %s changed", name, file)
+
+
+@st.cache_resource(show_spinner = False)
+def watch_datasets(_connect = connect_DB):
+    """
+    This function starts, once per process, the background watcher that refreshes the datasets
+    in the registry whenever their files change in Dropbox, along with the thread keeping the
+    mirror of the region labels current.
+    """
+    watcher = DropboxWatcher(_connect, registry).start()
+    threading.Thread(
+        target = mirror_rlabels, args = (registry,), daemon = True, name = "rlabels-mirror"
+    ).start()
+    return watcher
@@ -0,0 +1,261 @@
+"""
+Module Name:    Local Services
+Author:         Carlos Alberto Toruño Paniagua
+Date:           October 18th, 2026
+Description:    This module contains local stand-ins for the external services used by the EU
+                Copilot Dashboards, so the data and authentication layers can be exercised
+                without network access or real credentials.
+This version:   October 18th, 2026
+"""
+import json
+import time
+import hashlib
+import datetime
+import threading
+import email.utils
+import dropbox
+import dropbox.files
+import dropbox.exceptions
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class LocalOAuthServer:
+    """
+    Minimal OAuth2 token endpoint answering refresh-token grants the same way Dropbox does. It runs
+    on a background thread and can be used as a context manager:
+
+        with LocalOAuthServer(expires_in = 5) as server:
+            manager = passcheck.TokenManager(key, secret, refresh_token, token_url = server.url)
+
+    Each answer can be held back by delay seconds, to stand in for a slow endpoint, and the time
+    of every granted token is recorded in issued.
+    """
+
+    def __init__(self, expires_in = 14400, refresh_token = None, delay = 0):
+        self.expires_in    = expires_in
+        self.refresh_token = refresh_token
+        self.delay         = delay
+        self.requests      = 0
+        self.issued        = []
+        self._server       = None
+        self._thread       = None
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form   = parse_qs(self.rfile.read(length).decode())
+                token  = form.get("refresh_token", [None])[0]
+                if form.get("grant_type") != ["refresh_token"] or (
+                    service.refresh_token is not None and token != service.refresh_token
+                ):
+                    self._reply(400, {"error": "invalid_grant"})
+                    return
+                time.sleep(service.delay)
+                service.requests += 1
+                service.issued.append(time.monotonic())
+                self._reply(200, {
+                    "access_token": f"local-token-{service.requests}",
+                    "token_type": "bearer",
+                    "expires_in": service.expires_in
+                })
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/oauth2/token"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class LocalFileServer:
+    """
+    Static file server answering conditional requests (If-None-Match / If-Modified-Since) with
+    304 responses, the same way GitHub serves raw files. Files are changed with update():
+
+        with LocalFileServer({"region_labels.xlsx": content}) as server:
+            data_tools.RLABELS_URL = server.url("region_labels.xlsx")
+    """
+
+    def __init__(self, files = None):
+        self._files   = {}
+        self.requests = 0
+        self._server  = None
+        self._thread  = None
+        for name, content in (files or {}).items():
+            self.update(name, content)
+
+    def update(self, name, content):
+        modified = email.utils.formatdate(usegmt = True)
+        self._files[name] = (content, f'"{hashlib.sha1(content).hexdigest()}"', modified)
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                service.requests += 1
+                name = self.path.lstrip("/")
+                if name not in service._files:
+                    self.send_error(404)
+                    return
+                content, etag, modified = service._files[name]
+                if self.headers.get("If-None-Match") == etag or (
+                    "If-None-Match" not in self.headers
+                    and self.headers.get("If-Modified-Since") == modified
+                ):
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", modified)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def url(self, name):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{name}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _DownloadResponse:
+    """Stand-in for the HTTP response returned by files_download."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def iter_content(self, chunk_size = 1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeDropbox:
+    """
+    In-memory stand-in for the Dropbox client covering the calls made by the data layer:
+    metadata, downloads, folder listing cursors and long polling. Files are added or changed
+    with upload(), which wakes up any pending long poll, and reset_cursors() invalidates every
+    cursor handed out so far, as Dropbox does when it can no longer follow them.
+
+        dbx = FakeDropbox({"data4web_gpp.csv": content})
+        watcher = data_tools.DropboxWatcher(lambda: dbx, data_tools.registry, poll_timeout = 1)
+    """
+
+    def __init__(self, files = None):
+        self._files   = {}
+        self._log     = []
+        self._epoch   = 0
+        self._changed = threading.Condition()
+        for name, content in (files or {}).items():
+            self.upload(name, content)
+
+    def upload(self, name, content):
+        with self._changed:
+            self._files[name] = (content, f"{len(self._log) + 1:09x}")
+            self._log.append(name)
+            self._changed.notify_all()
+
+    def reset_cursors(self):
+        with self._changed:
+            self._epoch += 1
+            self._changed.notify_all()
+
+    def _cursor(self):
+        return f"{self._epoch}:{len(self._log)}"
+
+    def _position(self, cursor, error):
+        epoch, position = map(int, cursor.split(":"))
+        if epoch != self._epoch:
+            raise dropbox.exceptions.ApiError("local", error, None, None)
+        return position
+
+    def _metadata(self, name):
+        content, rev = self._files[name]
+        now = datetime.datetime(2024, 1, 1)
+        return dropbox.files.FileMetadata(
+            name = name, id = f"id:{name}", client_modified = now, server_modified = now,
+            rev = rev, size = len(content), path_lower = f"/{name.lower()}",
+            path_display = f"/{name}", content_hash = hashlib.sha256(content).hexdigest()
+        )
+
+    def files_get_metadata(self, path):
+        return self._metadata(path.lstrip("/"))
+
+    def files_download(self, path, rev = None):
+        name = path.lstrip("/")
+        return self._metadata(name), _DownloadResponse(self._files[name][0])
+
+    def files_list_folder_get_latest_cursor(self, path):
+        with self._changed:
+            return dropbox.files.ListFolderGetLatestCursorResult(cursor = self._cursor())
+
+    def files_list_folder_longpoll(self, cursor, timeout = 30):
+        reset           = dropbox.files.ListFolderLongpollError.reset
+        epoch, position = map(int, cursor.split(":"))
+        with self._changed:
+            self._changed.wait_for(lambda: self._epoch != epoch or len(self._log) > position, timeout)
+            changes = len(self._log) > self._position(cursor, reset)
+        return dropbox.files.ListFolderLongpollResult(changes = changes, backoff = None)
+
+    def files_list_folder_continue(self, cursor):
+        reset = dropbox.files.ListFolderContinueError.reset
+        with self._changed:
+            names   = list(dict.fromkeys(self._log[self._position(cursor, reset):]))
+            entries = [self._metadata(name) for name in names]
+            return dropbox.files.ListFolderResult(
+                entries = entries, cursor = self._cursor(), has_more = False
+            )
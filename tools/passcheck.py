@@ -9,6 +9,16 @@ This version:   May 20th, 2024
 import streamlit as st
 import requests
 import json
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = 'https://api.dropbox.com/oauth2/token'
+
+# Shortest pause of the refresher between two token requests, in seconds
+MIN_REFRESH_WAIT = 2
 
 # Defining a function to check for password
 def check_password():
@@ -39,14 +49,81 @@ def check_password():
         # Password correct.
         return True
     
+class TokenManager:
+    """
+    Process-wide holder of a short-lived Dropbox access token. The token is requested once and then
+    refreshed by a background thread shortly before it expires, so callers only block when there
+    is no valid token at all (i.e. on the very first request).
+    """
+
+    def __init__(self, key, secret, refresh_token, token_url = TOKEN_URL, margin = 300):
+        self.key           = key
+        self.secret        = secret
+        self.refresh_token = refresh_token
+        self.token_url     = token_url
+        self.margin        = margin
+        self._token        = None
+        self._expires_at   = 0.0
+        self._lifetime     = 0.0
+        self._lock         = threading.Lock()
+        self._refresher    = None
+
+    def _request_token(self):
+        data = {
+            'refresh_token': self.refresh_token,
+            'grant_type': 'refresh_token',
+            'client_id': self.key,
+            'client_secret': self.secret,
+        }
+        response = requests.post(self.token_url, data = data, timeout = 30)
+        response.raise_for_status()
+        response_data = json.loads(response.text)
+        expires_in    = response_data.get("expires_in", 14400)
+        return response_data["access_token"], time.time() + expires_in
+
+    def _refresh(self):
+        token, expires_at = self._request_token()
+        self._token, self._expires_at = token, expires_at
+        self._lifetime = expires_at - time.time()
+        return token
+
+    def _refresh_loop(self):
+        while True:
+            # Tokens living less than the margin are refreshed halfway through their lifetime
+            margin = min(self.margin, self._lifetime * 0.5)
+            wait   = self._expires_at - margin - time.time()
+            time.sleep(max(wait, MIN_REFRESH_WAIT))
+            try:
+                self._refresh()
+            except Exception:
+                # Keep serving the current token and try again in a few seconds
+                logger.warning("Dropbox token could not be refreshed, retrying", exc_info = True)
+                time.sleep(min(30, max(self.margin / 10, 1)))
+
+    def get_token(self):
+        """Returns a valid access token, only blocking when none is available."""
+        if self._token is not None and time.time() < self._expires_at:
+            return self._token
+        with self._lock:
+            if self._token is None or time.time() >= self._expires_at:
+                self._refresh()
+            if self._refresher is None:
+                self._refresher = threading.Thread(target = self._refresh_loop, daemon = True)
+                self._refresher.start()
+            return self._token
+
+
+_managers      = {}
+_managers_lock = threading.Lock()
+
+def get_token_manager(key, secret, refresh_token, token_url = TOKEN_URL):
+    """Returns the token manager shared by every session and page for these credentials."""
+    with _managers_lock:
+        manager_key = (key, refresh_token, token_url)
+        if manager_key not in _managers:
+            _managers[manager_key] = TokenManager(key, secret, refresh_token, token_url)
+        return _managers[manager_key]
+
 def retrieve_DBtoken(key, secret, refresh_token):
-    data = {
-        'refresh_token': refresh_token,
-        'grant_type': 'refresh_token',
-        'client_id': key,
-        'client_secret': secret,
-    }
-    response = requests.post('https://api.dropbox.com/oauth2/token', data = data)
-    response_data = json.loads(response.text)
-    access_token  = response_data["access_token"]
-    return access_token
\ No newline at end of file
+    access_token = get_token_manager(key, secret, refresh_token).get_token()
+    return access_token
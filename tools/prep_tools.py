@@ -0,0 +1,597 @@
+"""
+Module Name:    Preparation Tools
+Author:         Carlos Alberto Toruño Paniagua
+Date:           October 18th, 2026
+Description:    This module contains the data preparation stages of the EU Copilot Dashboards.
+                Each stage turns a dataset from the shared registry into the frames used by a
+                dashboard page, and is cached once per process and dataset version so widget
+                interactions only pay for filtering and plotting.
+This version:   October 18th, 2026
+"""
+import collections
+import numpy as np
+import pandas as pd
+import streamlit as st
+from tools import data_tools
+
+# Frames used by the dashboards. They are shared across sessions and must be treated as
+# read-only, copy-on-write (enabled by the dashboard pages) keeps derived frames from writing
+# back into them.
+GPPFrames = collections.namedtuple(
+    "GPPFrames", [
+        "data_points", "data_points_disag", "eu_data", "country_data", "indicators", "rankings",
+        "differences", "gaps", "trends"
+    ]
+)
+QRQFrames = collections.namedtuple("QRQFrames", ["data_points", "indicators", "rankings"])
+
+# Least squares fit of an indicator against another one. Each field is either a number or, when
+# returned by ols_fits(), a Data Frame with the fits of every pair of indicators.
+Trend = collections.namedtuple("Trend", ["slope", "intercept", "r_squared"])
+
+# Relative spread below which the values of an indicator are taken as constant by ols_fits()
+SPREAD_TOLERANCE = 1e-10
+
+# Demographic groups compared in the GPP dashboard, and the pair of groups whose absolute gap is
+# mapped for each dimension
+GAP_DIMENSIONS = {
+    "Income": {
+        "groups": [f"Income Quintile {i}" for i in range(1, 6)],
+        "gap": ["Income Quintile 1", "Income Quintile 5"]
+    },
+    "Gender": {
+        "groups": ["Female", "Male"],
+        "gap": ["Male", "Female"]
+    }
+}
+GAP_COLUMNS = ["country", "nuts_id", "nuts_ltn", "title", "subtitle"]
+
+# Measures reported by each section of the A2J workbook, the keys they are broken down by, and
+# the column holding the number of observations behind each row (rows below A2J_MIN_COUNT are
+# left out)
+A2J_SECTIONS = {
+    "Section1": {
+        "by": ["category"],
+        "measures": ["value2plot", "total_count", "total_incidents"],
+        "count": "total_count"
+    },
+    "Section2": {
+        "by": [],
+        "measures": ["advice", "get_information", "get_expert", "confidence"],
+        "count": None
+    },
+    "Section3": {
+        "by": ["adviser"],
+        "measures": ["value2plot"],
+        "count": "total_sources"
+    },
+    "Section4": {
+        "by": [],
+        "measures": ["fully_resolved", "problem_persists", "satisfaction"],
+        "count": None
+    },
+    "Section5": {
+        "by": [],
+        "measures": ["fair", "time", "financial_diff", "slow", "expensive"],
+        "count": None
+    },
+    "Section6": {
+        "by": [],
+        "measures": ["any_hardship", "health", "interpersonal", "economic", "drugs"],
+        "count": None
+    }
+}
+A2J_MIN_COUNT = 30
+
+# Demographic groups shown by each option of the A2J dashboard
+A2J_DEMOGRAPHICS = {
+    "Total sample": ["Total sample"],
+    "Disagreggated by Gender": ["Male", "Female"],
+    "Disagreggated by Income": ["Financially Tight", "Financially Stable"]
+}
+
+# Dimensions within which countries are ranked against each other
+RANK_KEYS = ["report", "chapter", "section", "title", "demographic"]
+
+# Columns of the GPP snapshot used by the GPP dashboard
+GPP_COLUMNS = [
+    "country", "level", "nuts_id", "nuts_ltn", "demographic", "report", "chapter", "section",
+    "title", "subtitle", "id", "value2plot", "direction", "reportValue", "value_realign"
+]
+
+
+def rank_countries(df, keys = RANK_KEYS):
+    """
+    This function ranks the countries of every indicator and demographic group in a single pass.
+    Rankings follow the realigned values, so the first place is always the best outcome whatever
+    the direction of the indicator. Missing values are ranked last.
+
+    Parameters:
+    df:         Pandas Data Frame with a value_realign column.
+    keys:       List of columns identifying an indicator. Columns missing from df are skipped.
+
+    Returns:
+    DataFrame:  Copy of df with a ranking column, empty for rows that are not at national level.
+    """
+    keys     = [key for key in keys if key in df.columns]
+    national = df.loc[df["level"] == "national"]
+    ranking  = (
+        national
+        .groupby(keys, observed = True)["value_realign"]
+        .rank(method = "first", ascending = False, na_option = "bottom")
+    )
+    return df.assign(ranking = ranking)
+
+
+def split_by_chapter(df):
+    """
+    Returns a dictionary with a (report, chapter) tuple as keys and the rows of each chapter as
+    values, keeping the original order of the rows.
+    """
+    return {key: frame for key, frame in df.groupby(["report", "chapter"], observed = True, sort = False)}
+
+
+def eu_differences(eu_data, country_data):
+    """
+    This function compares the value of every country against the EU value for each indicator.
+    Indicators measured only for the EU are kept with an empty country value, and the sections of
+    each chapter are ordered as they first appear in the EU data.
+
+    Parameters:
+    eu_data:        Pandas Data Frame with the EU values.
+    country_data:   Pandas Data Frame with the national values.
+
+    Returns:
+    dict:       Dictionary with a (country, report, chapter) tuple as keys and Data Frames with
+                the country_value, eu_value and difference of every indicator as values.
+    """
+    keys = ["report", "chapter", "section", "title", "subtitle"]
+
+    country_values = (
+        country_data
+        .groupby(["country"] + keys, observed = True)["value2plot"].mean()
+        .rename("country_value")
+        .reset_index()
+    )
+    eu_values = (
+        eu_data
+        .groupby(keys, observed = True)["value2plot"].mean()
+        .rename("eu_value")
+        .reset_index()
+    )
+    countries = pd.DataFrame({"country": country_values["country"].unique()})
+    table     = pd.merge(
+        country_values, eu_values.merge(countries, how = "cross"),
+        on = ["country"] + keys, how = "outer"
+    )
+    table["difference"] = table["country_value"] - table["eu_value"]
+
+    # Position of each section within its chapter, as shown in the country profile
+    sections = (
+        pd.concat([eu_data, country_data])
+        .drop_duplicates(subset = ["report", "chapter", "section"])
+        .loc[:, ["report", "chapter", "section"]]
+    )
+    sections["section_order"] = range(len(sections))
+    table = (
+        table
+        .merge(sections, on = ["report", "chapter", "section"], how = "left")
+        .sort_values(["country", "report", "chapter", "section_order", "title", "subtitle"])
+        .drop_duplicates(subset = ["country", "report", "chapter", "title"])
+        .drop(columns = "section_order")
+        .reset_index(drop = True)
+    )
+    return {
+        key: frame for key, frame in table.groupby(["country", "report", "chapter"], observed = True, sort = False)
+    }
+
+
+def demographic_gaps(data_points_disag, dimensions = GAP_DIMENSIONS):
+    """
+    This function computes the values of every demographic group side by side, and the absolute
+    gap between the groups compared for each dimension, for all indicators at regional and
+    national level in a single pivot.
+
+    Parameters:
+    data_points_disag:  Pandas Data Frame with the GPP values of every demographic group.
+    dimensions:         Dictionary with the groups of each dimension, as in GAP_DIMENSIONS.
+
+    Returns:
+    dict:       Dictionary with a (dimension, report, chapter, section, title, level) tuple as
+                keys and Data Frames with one column per group plus the difference as values.
+    """
+    # Grouping only the observed rows, keeping the national rows that have no NUTS name (a pivot
+    # table would either drop them or fill in every combination of the keys)
+    indicator = ["report", "chapter", "section", "title", "level"]
+    wide = (
+        data_points_disag
+        .loc[data_points_disag["level"].isin(["regional", "national"])]
+        .groupby(
+            indicator + ["country", "nuts_id", "nuts_ltn", "subtitle", "demographic"],
+            observed = True,
+            dropna   = False
+        )["value2plot"]
+        .mean()
+        .unstack("demographic")
+    )
+
+    gaps = {}
+    for dimension, spec in dimensions.items():
+        table = wide.reindex(columns = spec["groups"]).dropna(how = "all").reset_index()
+        table["difference"] = (table[spec["gap"][0]] - table[spec["gap"][1]]).abs()
+        for key, frame in table.groupby(indicator, observed = True, sort = False):
+            gaps[(dimension,) + key] = (
+                frame[GAP_COLUMNS + spec["groups"] + ["difference"]].reset_index(drop = True)
+            )
+    return gaps
+
+
+def gap_table(gaps, dimension, report, chapter, section, title, level):
+    """
+    Returns the demographic gaps of an indicator, as computed by demographic_gaps(), or an empty
+    table if the indicator is not disaggregated.
+    """
+    key = (dimension, report, chapter, section, title, level)
+    if key in gaps:
+        return gaps[key]
+    return pd.DataFrame(columns = GAP_COLUMNS + GAP_DIMENSIONS[dimension]["groups"] + ["difference"])
+
+
+def gap_values(gaps, dimension):
+    """
+    Returns a gap table in long format, with one row per demographic group and its value in the
+    value2plot column.
+    """
+    return (
+        gaps
+        .melt(
+            id_vars    = GAP_COLUMNS,
+            value_vars = GAP_DIMENSIONS[dimension]["groups"],
+            var_name   = "demographic",
+            value_name = "value2plot"
+        )
+        .dropna(subset = ["value2plot"])
+        .sort_values(["country", "title", "subtitle", "demographic"])
+        .reset_index(drop = True)
+    )
+
+
+def regional_matrix(df, keys):
+    """
+    This function arranges the regional values of a dataset as a matrix with one row per region
+    and one column per indicator. Duplicated rows keep their first value.
+
+    Parameters:
+    df:         Pandas Data Frame with the values of every indicator.
+    keys:       List of columns identifying an indicator.
+
+    Returns:
+    DataFrame:  Pandas Data Frame indexed by nuts_id, with the indicators as columns.
+    """
+    return (
+        df
+        .loc[df["level"] == "regional"]
+        .drop_duplicates(subset = ["nuts_id"] + keys)
+        .pivot_table(
+            index    = "nuts_id",
+            columns  = keys,
+            values   = "value2plot",
+            aggfunc  = "first",
+            observed = True
+        )
+    )
+
+
+def ols_fits(x, y):
+    """
+    This function fits a simple linear regression of every column of y against every column of x
+    in a single batch of matrix products. Each pair only uses the rows where both values are
+    available.
+
+    Parameters:
+    x:          Pandas Data Frame with the explanatory indicators as columns.
+    y:          Pandas Data Frame with the explained indicators as columns, and the same index as x.
+
+    Returns:
+    Trend:      Named tuple with the slopes, intercepts and R² of every pair, as Data Frames with
+                the columns of x as index and the columns of y as columns. Pairs with less than
+                two distinct values are NaN.
+    """
+    X  = x.to_numpy(dtype = "float64")
+    Y  = y.to_numpy(dtype = "float64")
+    mx = ~np.isnan(X)
+    my = ~np.isnan(Y)
+    X  = np.where(mx, X, 0.0)
+    Y  = np.where(my, Y, 0.0)
+    mx = mx.astype("float64")
+    my = my.astype("float64")
+
+    # The one-pass sums of squares lose precision in proportion to the sums of the squared values,
+    # so spreads below that rounding error are treated as constant values
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        n         = mx.T @ my
+        sx        = X.T @ my
+        sy        = mx.T @ Y
+        sxx_raw   = (X**2).T @ my
+        syy_raw   = mx.T @ (Y**2)
+        sxx       = sxx_raw - sx**2 / n
+        syy       = syy_raw - sy**2 / n
+        sxy       = X.T @ Y - sx * sy / n
+        slope     = np.where(sxx > SPREAD_TOLERANCE * sxx_raw, sxy / sxx, np.nan)
+        r2        = np.where(syy > SPREAD_TOLERANCE * syy_raw, sxy**2 / (sxx * syy), 0.0)
+        intercept = (sy - slope * sx) / n
+
+    def as_frame(values):
+        return pd.DataFrame(values, index = x.columns, columns = y.columns)
+
+    return Trend(
+        slope     = as_frame(slope),
+        intercept = as_frame(intercept),
+        r_squared = as_frame(np.where(np.isnan(slope), np.nan, r2))
+    )
+
+
+def trend_fit(trends, x, y):
+    """
+    Returns the fit of indicator y against indicator x, as computed by ols_fits(), or None if the
+    pair cannot be fitted.
+    """
+    try:
+        fit = Trend(*(float(values.loc[x, y]) for values in trends))
+    except KeyError:
+        return None
+    if np.isnan(fit.slope):
+        return None
+    return fit
+
+
+def prepare_gpp(df):
+    """
+    This function prepares the GPP snapshot for the GPP dashboard: values are expressed as
+    percentages, duplicated rows are dropped, countries are ranked for every indicator and
+    demographic group, the total sample is split by level, every country is compared against
+    the EU values, the demographic gaps of every indicator are computed and every pair of
+    indicators is fitted for the Cross Lab.
+
+    Parameters:
+    df:         Pandas Data Frame with the GPP snapshot, as returned by data_tools.get_dataset().
+
+    Returns:
+    GPPFrames:  Named tuple with the prepared frames, the indicator cube of the total sample, the
+                national rankings and the differences against the EU of every chapter, the
+                demographic gaps of every indicator and the regional fits of every pair of titles.
+    """
+    # Rows are only taken when there are duplicates, otherwise every column other than the values
+    # keeps viewing the memory-mapped snapshot instead of being copied
+    data       = df[[col for col in GPP_COLUMNS if col in df.columns]]
+    duplicated = data.duplicated()
+    if duplicated.any():
+        data = data.loc[~duplicated]
+
+    data_points_disag = rank_countries(
+        data.assign(
+            value2plot    = data['value2plot'] * 100,
+            value_realign = data['value_realign'] * 100
+        )
+    )
+    data_points = data_points_disag[data_points_disag['demographic'] == "Total Sample"]
+
+    eu_data = (
+        data_points
+        .loc[(data_points['level'] == "eu")]
+        .reset_index()
+        .sort_values(by = "value_realign", ascending = False)
+        .reset_index(drop = True)
+    )
+
+    country_data = (
+        data_points
+        .loc[(data_points["level"] == "national")]
+        .reset_index()
+    )
+    country_data = country_data.assign(ranking = country_data["ranking"].astype(int))
+    regional     = regional_matrix(data_points, ["title"])
+
+    return GPPFrames(
+        data_points       = data_points,
+        data_points_disag = data_points_disag,
+        eu_data           = eu_data,
+        country_data      = country_data,
+        indicators        = data_tools.IndicatorCube(data_points),
+        rankings          = split_by_chapter(country_data),
+        differences       = eu_differences(eu_data, country_data),
+        gaps              = demographic_gaps(data_points_disag),
+        trends            = ols_fits(regional, regional)
+    )
+
+
+def prepare_qrq(df):
+    """
+    This function prepares the QRQ snapshot for the QRQ dashboard: the snapshot is indexed by
+    indicator and the countries are ranked for every subpillar.
+
+    Parameters:
+    df:         Pandas Data Frame with the QRQ snapshot, as returned by data_tools.get_dataset().
+
+    Returns:
+    QRQFrames:  Named tuple with the snapshot, its indicator cube and the national rankings of
+                every chapter.
+    """
+    national = (
+        df
+        .loc[df['level'] == "national"]
+        .drop_duplicates(subset = ["report", "chapter", "country", "indicator"])
+    )
+    return QRQFrames(
+        data_points = df,
+        indicators  = data_tools.IndicatorCube(df),
+        rankings    = split_by_chapter(rank_countries(national))
+    )
+
+
+def aggregate_a2j(data, sections = A2J_SECTIONS, demographics = A2J_DEMOGRAPHICS):
+    """
+    This function computes every view of the A2J dashboard in a single pass per section: the rows
+    of each country and the EU averages, for every option of demographics.
+
+    Parameters:
+    data:           Dictionary with the sheets of the A2J workbook, as returned by
+                    data_tools.get_dataset().
+    sections:       Dictionary describing the measures of each sheet, as in A2J_SECTIONS.
+    demographics:   Dictionary with the demographic groups of each option, as in A2J_DEMOGRAPHICS.
+
+    Returns:
+    dict:       Dictionary with a (scope, country, demographic option, section) tuple as keys and
+                Data Frames as values. The scope is either 'EU' or 'Country'.
+    """
+    # Sheets spell the groups differently ('Total sample' and 'Total Sample')
+    groups = {
+        group.casefold(): (option, group)
+        for option, option_groups in demographics.items() for group in option_groups
+    }
+
+    views = {}
+    for section, spec in sections.items():
+        df = data[section]
+        if spec["count"] is not None:
+            df = df.loc[~(df[spec["count"]] < A2J_MIN_COUNT)]
+        matches = df["demographic"].str.casefold().map(groups).dropna()
+        df = df.loc[matches.index].assign(
+            demographic = [group for _, group in matches],
+            option      = [option for option, _ in matches]
+        )
+
+        for (country, option), frame in df.groupby(["country_name_ltn", "option"], observed = True, sort = False):
+            views[("Country", country, option, section)] = frame.drop(columns = "option")
+
+        eu_averages = (
+            df
+            .groupby(["option", "demographic"] + spec["by"], observed = True)[spec["measures"]].mean()
+            .reset_index()
+        )
+        eu_averages.insert(0, "country_name_ltn", "European Union")
+        for option, frame in eu_averages.groupby("option", sort = False):
+            views[("EU", "European Union", option, section)] = (
+                frame.drop(columns = "option").reset_index(drop = True)
+            )
+    return views
+
+
+def a2j_sections(views, scope, country, demographic):
+    """
+    Returns a list with the frames of the A2J sections for a view of the dashboard. Sections
+    without data for the view are returned empty.
+    """
+    empty = {
+        section: pd.DataFrame(columns = ["country_name_ltn", "demographic"] + spec["by"] + spec["measures"])
+        for section, spec in A2J_SECTIONS.items()
+    }
+    return [
+        views.get((scope, country, demographic, section), empty[section]).copy()
+        for section in A2J_SECTIONS
+    ]
+
+
+@st.cache_resource(show_spinner = False, max_entries = 2)
+def _prepared_gpp(version, _df):
+    return prepare_gpp(_df)
+
+
+def gpp_frames(dbx):
+    """
+    This function returns the prepared GPP frames, running prepare_gpp() once per process for
+    every version of the GPP snapshot held in the registry.
+
+    Parameters:
+    dbx:        Dropbox client object.
+
+    Returns:
+    GPPFrames:  Named tuple with the shared, read-only GPP frames.
+    """
+    # Reading the version first, so a refresh landing in between is prepared on the next rerun
+    version = data_tools.registry.version("gpp")
+    df      = data_tools.get_dataset(dbx, "gpp")
+    return _prepared_gpp(version, df)
+
+
+@st.cache_resource(show_spinner = False, max_entries = 2)
+def _prepared_qrq(version, _df):
+    return prepare_qrq(_df)
+
+
+def qrq_frames(dbx):
+    """
+    This function returns the prepared QRQ frames, running prepare_qrq() once per process for
+    every version of the QRQ snapshot held in the registry.
+
+    Parameters:
+    dbx:        Dropbox client object.
+
+    Returns:
+    QRQFrames:  Named tuple with the shared, read-only QRQ frames.
+    """
+    version = data_tools.registry.version("qrq")
+    df      = data_tools.get_dataset(dbx, "qrq")
+    return _prepared_qrq(version, df)
+
+
+def compare_qrq_gpp(qrq, gpp):
+    """
+    This function fits the regional values of every GPP indicator against the scores of every QRQ
+    subpillar, for the GPP Contextualization view of the QRQ dashboard.
+
+    Parameters:
+    qrq:        Pandas Data Frame with the QRQ snapshot.
+    gpp:        Pandas Data Frame with the GPP snapshot.
+
+    Returns:
+    Trend:      Named tuple with the fits of every pair, indexed by the (report, chapter, section,
+                title) of the QRQ subpillars and by the (section, title) of the GPP indicators.
+    """
+    x = regional_matrix(qrq, ["report", "chapter", "section", "title"])
+    y = regional_matrix(gpp.loc[gpp["demographic"] == "Total Sample"], ["section", "title"]) * 100
+    x, y = x.align(y, join = "inner", axis = 0)
+    return ols_fits(x, y)
+
+
+@st.cache_resource(show_spinner = False, max_entries = 2)
+def _compared_qrq_gpp(versions, _qrq, _gpp):
+    return compare_qrq_gpp(_qrq, _gpp)
+
+
+def qrq_gpp_trends(dbx):
+    """
+    This function returns the fits of the GPP indicators against the QRQ subpillars, running
+    compare_qrq_gpp() once per process for every pair of dataset versions held in the registry.
+
+    Parameters:
+    dbx:        Dropbox client object.
+
+    Returns:
+    Trend:      Named tuple with the shared, read-only fits, as returned by compare_qrq_gpp().
+    """
+    versions = (data_tools.registry.version("qrq"), data_tools.registry.version("gpp"))
+    qrq      = data_tools.get_dataset(dbx, "qrq")
+    gpp      = data_tools.get_dataset(dbx, "gpp")
+    return _compared_qrq_gpp(versions, qrq, gpp)
+
+
+@st.cache_resource(show_spinner = False, max_entries = 2)
+def _aggregated_a2j(version, _data):
+    return aggregate_a2j(_data)
+
+
+def a2j_views(dbx):
+    """
+    This function returns the views of the A2J dashboard, running aggregate_a2j() once per
+    process for every version of the A2J workbook held in the registry.
+
+    Parameters:
+    dbx:        Dropbox client object.
+
+    Returns:
+    dict:       Dictionary with the shared, read-only views, as returned by aggregate_a2j().
+    """
+    version = data_tools.registry.version("a2j")
+    data    = data_tools.get_dataset(dbx, "a2j")
+    return _aggregated_a2j(version, data)
@@ -2,9 +2,11 @@
 Module Name:    Password Check
 Author:         Carlos Alberto Toruño Paniagua
 Date:           June 7th, 2024
-Description:    This module contains the code for inserting a grouped menu on side bar
-This version:   June 7th, 2024
+Description:    This module contains the code for inserting a grouped menu on side bar and the
+                lazy tab selectors used by the dashboards
+This version:   October 18th, 2026
 """
+import streamlit as st
 from st_pages import Page, Section, show_pages, add_page_title
 def insert_smenu():
     add_page_title()
@@ -24,4 +26,34 @@ def insert_smenu():
             Page("pages/10_A2J_Dashboard.py", "Access to Justice Journey", in_section=True),
             Page("pages/8_Information.py", "Information", in_section=False)
         ]
-    )
\ No newline at end of file
+    )
+
+
+def lazy_tabs(labels, key):
+    """
+    Tab-like selector whose panels are only evaluated when shown. Unlike st.tabs, which runs and
+    sends the content of every tab on each rerun, this function returns one flag per panel and
+    only the selected one is True:
+
+        map_tab, bars_tab = sidemenu.lazy_tabs(["Map", "Bars"], key = "indicator_panel")
+        if map_tab:
+            ...
+
+    The selection is kept in the session state under the given key, so the same panel stays open
+    across reruns.
+
+    Parameters:
+    labels:     List of strings with the names of the panels.
+    key:        String with the widget key of the selector.
+
+    Returns:
+    list:       List of booleans, one per panel.
+    """
+    selected = st.radio(
+        "Panel",
+        labels,
+        horizontal       = True,
+        key              = key,
+        label_visibility = "collapsed"
+    )
+    return [label == selected for label in labels]
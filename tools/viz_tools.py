@@ -4,15 +4,175 @@ Author:         Carlos Alberto Toruño Paniagua
 Date:           May 20th, 2024
 Description:    This module contains all the functions and classes to be used by the EU Copilot 
                 Dashboard for visualizing GPP data.
-This version:   May 24th, 2024
+This version:   October 18th, 2026
 """
+import os
+import json
+import time
+import hashlib
+import threading
+import functools
+import logging
+from collections import OrderedDict
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 import pandas as pd
-from sklearn.linear_model import LinearRegression
+
+logger = logging.getLogger(__name__)
+
+# Memory cap of the serialized figures kept by the figure cache, and seconds between the log
+# records of its statistics
+FIGURE_CACHE_BYTES = int(os.environ.get("EUCOPILOT_FIGURE_CACHE_MB", 128)) * 1024 * 1024
+FIGURE_CACHE_LOG   = 10 * 60
+
+
+class FigureCache:
+    """
+    Process-wide LRU store of the figures returned by the chart builders, shared by every page and
+    session. Figures are kept as their serialized JSON, keyed by a hash of the builder inputs, and
+    the least recently used ones are evicted once the total size goes over max_bytes. The
+    statistics of the cache are logged every log_interval seconds while it is in use.
+    """
+
+    def __init__(self, max_bytes = FIGURE_CACHE_BYTES, log_interval = FIGURE_CACHE_LOG):
+        self.max_bytes    = max_bytes
+        self.log_interval = log_interval
+        self._entries     = OrderedDict()
+        self._bytes       = 0
+        self._lock        = threading.Lock()
+        self._logged_at   = time.monotonic()
+        self.hits         = 0
+        self.misses       = 0
+        self.evictions    = 0
+
+    def get(self, key):
+        """Returns the serialized figure stored under key, or None if it is not cached."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            due = time.monotonic() - self._logged_at >= self.log_interval
+            if due:
+                self._logged_at = time.monotonic()
+        if due:
+            self.log_stats()
+        return payload
+
+    def log_stats(self):
+        stats   = self.stats()
+        lookups = stats["hits"] + stats["misses"]
+        logger.info(
+            "Figure cache: %d hits, %d misses (%.0f%% hit rate), %d evictions, %d entries, "
+            "%.1f of %.0f MB",
+            stats["hits"], stats["misses"], 100 * stats["hits"] / lookups if lookups else 0,
+            stats["evictions"], stats["entries"], stats["bytes"] / 1024**2, stats["max_bytes"] / 1024**2
+        )
+
+    def put(self, key, payload):
+        """Stores a serialized figure, evicting the least recently used ones over max_bytes."""
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = payload
+            self._bytes       += size
+            while self._bytes > self.max_bytes:
+                _, evicted      = self._entries.popitem(last = False)
+                self._bytes    -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Returns the hit, miss and eviction counters together with the current cache size."""
+        with self._lock:
+            return {
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "evictions": self.evictions,
+                "entries":   len(self._entries),
+                "bytes":     self._bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+figure_cache = FigureCache()
+
+def _fingerprint(value):
+    """
+    Returns a hashable description of a builder input. Frames and arrays are described by their
+    content, plain values by themselves and containers by their items. Objects carrying a content
+    digest (such as the map layers) are described by it. Any other object raises a TypeError.
+    """
+    digest = getattr(value, "digest", None)
+    if isinstance(digest, str):
+        return (type(value).__name__, digest)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        hashed = pd.util.hash_pandas_object(value, index = True).values
+        frame  = value.to_frame() if isinstance(value, pd.Series) else value
+        return (
+            type(value).__name__,
+            tuple(map(str, frame.columns)),
+            tuple(map(str, frame.dtypes)),
+            hashlib.sha1(hashed.tobytes()).hexdigest()
+        )
+    if isinstance(value, np.ndarray):
+        return ("ndarray", str(value.dtype), value.shape, hashlib.sha1(value.tobytes()).hexdigest())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_fingerprint(item) for item in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted(
+            ((key, _fingerprint(item)) for key, item in value.items()), key = lambda pair: repr(pair[0])
+        ))
+    raise TypeError(f"Cannot fingerprint {type(value).__name__}")
+
+def cached_figure(builder):
+    """
+    Decorator serving the figures of a chart builder from the process-wide figure cache. The cache
+    key is taken before calling the builder, as some builders modify the data they receive, and
+    each hit returns a new Figure, so callers can update it freely. Inputs that cannot be hashed
+    bypass the cache.
+    """
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        try:
+            fingerprint = (
+                builder.__qualname__,
+                _fingerprint(args),
+                _fingerprint(kwargs)
+            )
+        except TypeError:
+            logger.debug("Figure cache bypassed for %s", builder.__qualname__)
+            return builder(*args, **kwargs)
+        key = hashlib.sha1(repr(fingerprint).encode()).hexdigest()
+
+        payload = figure_cache.get(key)
+        if payload is None:
+            fig = builder(*args, **kwargs)
+            figure_cache.put(key, fig.to_json())
+            return fig
+
+        # The cached figure was validated when it was built, so it is rebuilt without validation
+        return go.Figure(json.loads(payload), _validate = False)
+
+    return wrapper
 
 
+@cached_figure
 def genBars(data, cpal, level):
 
     if level  == "EU":
@@ -125,16 +285,31 @@ def wrap_text(text):
 
     return '<br>'.join(lines)
 
-def genScatter(data, xtitle, ytitle, color_map):
+def trendTrace(x, trend):
+    """
+    Returns the red regression line of a scatter plot, drawn over the observed values of x from
+    a fit computed by prep_tools.ols_fits().
+    """
+    x = np.sort(np.asarray(x, dtype = "float64"))
+    return go.Scatter(
+        x          = x,
+        y          = trend.intercept + trend.slope * x,
+        mode       = "lines",
+        line       = dict(color = "red"),
+        name       = "Trendline",
+        showlegend = False,
+        hoverinfo  = "skip"
+    )
+
+@cached_figure
+def genScatter(data, xtitle, ytitle, color_map, trend = None):
     fig = px.scatter(
             data, 
             x = "xaxis", 
             y = "yaxis", 
             color = "xaxis",
-            trendline   = "ols",
             custom_data = ["country", "nuts_id", "xaxis", "yaxis", "demographic"],
-            color_continuous_scale    = color_map,
-             trendline_color_override = "red"
+            color_continuous_scale    = color_map
         )
     fig.update(
         layout_coloraxis_showscale = False
@@ -177,8 +352,12 @@ def genScatter(data, xtitle, ytitle, color_map):
             font_family = "Lato"
         )
     )
+    if trend is not None:
+        fitted = data.dropna(subset = ["xaxis", "yaxis"])
+        fig.add_trace(trendTrace(fitted["xaxis"], trend))
     return fig
 
+@cached_figure
 def genBees(country_data, country_select):
 
     ntopics = len(
@@ -223,6 +402,7 @@ def genBees(country_data, country_select):
     )
     return fig
 
+@cached_figure
 def genDotties(data, topic, groupings, stat):
     if stat == "Data Points":
         xaxis = "value2plot"
@@ -255,10 +435,34 @@ def genDotties(data, topic, groupings, stat):
     )
     return fig
 
-def genMap(data4map, eu_nuts, color_palette, dem = False):
+def mapLayer(eu_nuts, resolution, locations):
+    """
+    Returns the regions of the map layer at the given resolution that are plotted in a map, so
+    only their geometry is sent to the browser.
+
+    Parameters:
+    eu_nuts:    Dictionary with the GeoJSON layer of every resolution, as returned by
+                data_tools.build_map_layers().
+    resolution: String with the resolution of the layer, one of data_tools.MAP_RESOLUTIONS.
+    locations:  Iterable with the NUTS IDs plotted in the map.
+
+    Returns:
+    dict:       GeoJSON dictionary with the features of the plotted regions.
+    """
+    ids = set(locations)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            feature for feature in eu_nuts[resolution]["features"]
+            if feature["properties"]["polID"] in ids
+        ]
+    }
+
+@cached_figure
+def genMap(data4map, eu_nuts, color_palette, dem = False, resolution = "medium"):
     fig = px.choropleth_mapbox(
         data4map,
-        geojson      = eu_nuts,
+        geojson      = mapLayer(eu_nuts, resolution, data4map["nuts_id"]),
         locations    = "nuts_id",
         featureidkey = "properties.polID",
         mapbox_style = "carto-positron",
@@ -294,27 +498,56 @@ def genMap(data4map, eu_nuts, color_palette, dem = False):
     return fig
 
 
+@cached_figure
 def genDumbbell(subset_df, subsection):
 
     fig = go.Figure()
 
-    subset_df['title'] = subset_df['title'].apply(wrap_text)
-
-    for index, row in subset_df.iterrows():
+    # All dumbbells are drawn with three traces: the connecting segments, separated by None, and
+    # the EU and country markers. Per-row labels and colours are carried in arrays, titles are
+    # sent once as tick labels and the hover text is filled from customdata.
+    codes, titles = pd.factorize(pd.Series([wrap_text(title) for title in subset_df['title']]))
+    eu_vals  = subset_df['eu_value'].to_numpy(dtype = 'float64').round(2)
+    ctr_vals = subset_df['country_value'].to_numpy(dtype = 'float64').round(2)
+    gains    = subset_df['difference'].to_numpy() > 0
+    hover    = dict(
+        customdata = list(zip(
+            [wrap_text(subtitle) for subtitle in subset_df['subtitle']],
+            [wrap_text(country) for country in subset_df['country']],
+            subset_df['country_value'].to_numpy(dtype = 'float64').round(1),
+            subset_df['eu_value'].to_numpy(dtype = 'float64').round(1)
+        )),
+        hovertemplate = (
+            "<br><i>%{customdata[0]}</i></b><br><b>Reported %{customdata[1]} Value:</b> "
+            "%{customdata[2]:.1f}<br><b>Reported EU Value:</b> %{customdata[3]:.1f}<extra></extra>"
+        ),
+        hoverlabel = dict(font_size = 13, align = 'left')
+    )
 
-        fig.add_trace(go.Scatter(
-            x = [row['eu_value'], row['country_value']],
-            y = [row['title'], row['title']],
-            mode = 'lines+markers+text',
-            marker = dict(size = 13, color = ['blue', 'red']),
-            line = dict(color = 'gray'),
-            text = [None, f"{row['difference']:+.2f}"],
-            textposition = 'middle right' if row['difference'] > 0 else 'middle left',
-            textfont = dict(color = 'green' if row['difference'] > 0 else 'red'),
-            hoverinfo='text',
-            hovertext = f"<br><i>{wrap_text(row['subtitle'])}</i></b><br><b>Reported {wrap_text(row['country'])} Value:</b> {row['country_value']:.1f}<br><b>Reported EU Value:</b> {row['eu_value']:.1f}",
-            hoverlabel=dict(font_size=13, align='left')
-        ))
+    fig.add_trace(go.Scatter(
+        x = [value for pair in zip(eu_vals, ctr_vals) for value in (*pair, None)],
+        y = [value for code in codes for value in (code, code, None)],
+        mode = 'lines',
+        line = dict(color = 'gray'),
+        hoverinfo = 'skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x = eu_vals,
+        y = codes,
+        mode = 'markers',
+        marker = dict(size = 13, color = 'blue'),
+        **hover
+    ))
+    fig.add_trace(go.Scatter(
+        x = ctr_vals,
+        y = codes,
+        mode = 'markers+text',
+        marker = dict(size = 13, color = 'red'),
+        text = [f"{difference:+.2f}" for difference in subset_df['difference']],
+        textposition = np.where(gains, 'middle right', 'middle left'),
+        textfont = dict(color = np.where(gains, 'green', 'red')),
+        **hover
+    ))
 
     height = max(200, 100 * len(subset_df))
 
@@ -323,7 +556,13 @@ def genDumbbell(subset_df, subsection):
         height = height,
         width = 800,
         xaxis = dict(range = [0,100]),
-        yaxis = dict(showgrid = False),
+        yaxis = dict(
+            showgrid = False,
+            type     = 'category',
+            tickmode = 'array',
+            tickvals = list(range(len(titles))),
+            ticktext = list(titles)
+        ),
         xaxis_title = None,
         yaxis_title = None,
         template = "plotly_white",
@@ -335,41 +574,48 @@ def genDumbbell(subset_df, subsection):
     return fig
     
 
-def genRankingsViz(subset_df, subsection, chosen_country):
-
-    color_scale = px.colors.qualitative.G10
-    subset_df['subtitle'] = subset_df['subtitle'].apply(wrap_text)
-    subset_df['title'] = subset_df['title'].apply(wrap_text)
-
-
+def genRankingScatter(data, y, title, chosen_country, value_line, height):
+    """
+    Builds the ranking charts of the dashboards: one marker per country and indicator, coloured
+    by country, with the chosen country highlighted and every other country faded.
+
+    Parameters:
+    data:           Pandas Data Frame with the country, ranking, value2plot and subtitle columns.
+    y:              String with the column holding the indicator names.
+    title:          String with the title of the chart.
+    chosen_country: String with the country to highlight.
+    value_line:     String with the hover line displaying the reported value.
+    height:         Integer with the height of the chart.
+
+    Returns:
+    Figure:     Plotly figure with one trace per country.
+    """
     fig = px.scatter(
-        subset_df,
+        data,
         x = 'ranking',
-        y = 'title', # wrap 
-        title = f'{subsection}',
+        y = y,
+        title = title,
         color = 'country',
-        color_discrete_sequence=color_scale,
-        custom_data=['country', 'value2plot', 'subtitle', 'ranking'],
-        range_color=[1,27]
+        color_discrete_sequence = px.colors.qualitative.G10,
+        custom_data = ['country', 'value2plot', 'subtitle', 'ranking'],
+        range_color = [1,27]
     )
 
-    # opacity of chosen country bolded, every thing else faded
-    for trace_index, country in enumerate(subset_df['country']):
-        opacity = 1 if country == chosen_country else 0.1
-        fig.update_traces(selector=dict(name=country), opacity=opacity)
+    # opacity of chosen country bolded, every thing else faded, set once per trace
+    fig.for_each_trace(
+        lambda trace: trace.update(opacity = 1 if trace.name == chosen_country else 0.1)
+    )
 
     fig.update_traces(
-    hovertemplate="<br>".join([
-        "<b><span style='font-size: 14px;'>%{customdata[0]}</span></b>",  
-        "<i><b>Reported Value: %{customdata[1]:.1f}</i>",
-        "<i>Context: %{customdata[2]}</i>",
-        "Ranking: %{customdata[3]}"
-    ])
+        hovertemplate = "<br>".join([
+            "<b><span style='font-size: 14px;'>%{customdata[0]}</span></b>",
+            value_line,
+            "<i>Context: %{customdata[2]}</i>",
+            "Ranking: %{customdata[3]}"
+        ]),
+        marker = dict(size = 11)
     )
 
-    # make the height dependent on length of df
-    height = max(200, 2 * len(subset_df))
-
     fig.update_layout(
         height=height,
         width=860,
@@ -377,16 +623,32 @@ def genRankingsViz(subset_df, subsection, chosen_country):
         yaxis_title=None,
         template="plotly_white",
         showlegend=False,
-        margin=dict(l=50, r=50, t=50, b=50),  
-        yaxis=dict(showgrid = False),  
-        xaxis=dict(showgrid = False)   
+        margin=dict(l=50, r=50, t=50, b=50),
+        yaxis=dict(showgrid = False),
+        xaxis=dict(showgrid = False)
     )
 
-    fig.update_traces(marker=dict(size=11))
-
     return fig
 
 
+@cached_figure
+def genRankingsViz(subset_df, subsection, chosen_country):
+
+    subset_df = subset_df.assign(
+        subtitle = subset_df['subtitle'].apply(wrap_text),
+        title    = subset_df['title'].apply(wrap_text)
+    )
+
+    # make the height dependent on length of df
+    height = max(200, 2 * len(subset_df))
+
+    return genRankingScatter(
+        subset_df, 'title', f'{subsection}', chosen_country,
+        "<i><b>Reported Value: %{customdata[1]:.1f}</i>", height
+    )
+
+
+@cached_figure
 def QRQ_country_scatter(df, country, chapter):
     # df should be subset by country, level = regional and contain only QRQ values
     df['section'] = df['section'].apply(wrap_text)
@@ -447,7 +709,8 @@ def QRQ_country_scatter(df, country, chapter):
 
 
 
-def gen_compare_scatter(subset, section, gpp_indicator):
+@cached_figure
+def gen_compare_scatter(subset, section, gpp_indicator, trend = None):
     # subset["subtitle"] = subset["subtitle"].apply(wrap_text)
     qrq_data = subset[subset['title'] == section]
     gpp_data = subset[subset['title'] == gpp_indicator]
@@ -461,8 +724,6 @@ def gen_compare_scatter(subset, section, gpp_indicator):
         )
 
     merged = pd.merge(qrq_data, gpp_data, on='nuts_id', suffixes=('_qrq', '_gpp'))
-    print("merged.info():")
-    print(merged.info())
 
     # Ensure merged data is not empty before proceeding
     if merged.empty:
@@ -472,17 +733,7 @@ def gen_compare_scatter(subset, section, gpp_indicator):
             yaxis_title=f"{gpp_indicator} (GPP value)"
         )
     
-    # regress
     merged.dropna(subset=['value2plot_qrq', 'value2plot_gpp'], inplace=True)
-    X = merged['value2plot_qrq'].values.reshape(-1, 1)
-    y = merged['value2plot_gpp'].values
-
-    # fit model
-    reg = LinearRegression().fit(X, y)
-    trendline = reg.predict(X)
-
-    # R-squared value
-    r_squared = reg.score(X, y)
 
     # color map
     unique_countries = merged['country_qrq'].unique()
@@ -527,87 +778,43 @@ def gen_compare_scatter(subset, section, gpp_indicator):
 
     fig.update_traces(marker=dict(size=7))
 
-        # Add trendline
-    fig.add_trace(
-        go.Scatter(
-            x=merged['value2plot_qrq'],
-            y=trendline,
-            mode='lines',
-            line=dict(color='red'),
-            name='Trendline'
+    # Add trendline and R-squared annotation, fitted by prep_tools.ols_fits()
+    if trend is not None:
+        fig.add_trace(trendTrace(merged['value2plot_qrq'], trend))
+        fig.add_annotation(
+            x=max(merged['value2plot_qrq']),
+            y=min(merged['value2plot_gpp']),
+            text=f'R² = {trend.r_squared:.2f}',
+            showarrow=False,
+            font=dict(size=12, color='red')
         )
-    )
-
-    # Add R-squared annotation
-    fig.add_annotation(
-        x=max(merged['value2plot_qrq']),
-        y=min(merged['value2plot_gpp']),
-        text=f'R² = {r_squared:.2f}',
-        showarrow=False,
-        font=dict(size=12, color='red')
-    )
 
     return fig
 
 
+@cached_figure
 def gen_qrq_rankins(df, chosen_country, theme, chapter):
-    color_scale = px.colors.qualitative.G10
     if not df['section'].isna().all():
-        df['section'] = df['section'].apply(lambda x: wrap_text(x) if pd.notna(x) else x)
+        df = df.assign(section = df['section'].apply(lambda x: wrap_text(x) if pd.notna(x) else x))
     
     if not df['subtitle'].isna().all():
-        df['subtitle'] = df['subtitle'].apply(lambda x: wrap_text(x) if pd.notna(x) else x)
+        df = df.assign(subtitle = df['subtitle'].apply(lambda x: wrap_text(x) if pd.notna(x) else x))
 
     df = df.loc[(df['report'] == theme)]
     df = df.loc[df['chapter'] == chapter]
 
-    fig = px.scatter(
-        df,
-        x='ranking',
-        y='section',  
-        title=chapter,
-        color='country',
-        color_discrete_sequence=color_scale,
-        custom_data=['country', 'value2plot', 'subtitle', 'ranking'],
-        range_color=[1, 27]
+    return genRankingScatter(
+        df, 'section', chapter, chosen_country,
+        "<i><b>QRQ Score: %{customdata[1]:.3f}</i>", 450
     )
 
-        # opacity of chosen country bolded, every thing else faded
-    for trace_index, country in enumerate(df['country']):
-        opacity = 1 if country == chosen_country else 0.1
-        fig.update_traces(selector=dict(name=country), opacity=opacity)
 
-    fig.update_traces(
-    hovertemplate="<br>".join([
-        "<b><span style='font-size: 14px;'>%{customdata[0]}</span></b>",  
-        "<i><b>QRQ Score: %{customdata[1]:.3f}</i>",
-        "<i>Context: %{customdata[2]}</i>",
-        "Ranking: %{customdata[3]}"
-    ])
-    )
 
-    fig.update_layout(
-        height=450,
-        width=860,
-        xaxis_title='Ranking in the EU',
-        yaxis_title=None,
-        template="plotly_white",
-        showlegend=False,
-        margin=dict(l=50, r=50, t=50, b=50),  
-        yaxis=dict(showgrid = False),  
-        xaxis=dict(showgrid = False)   
-    )
-
-    fig.update_traces(marker=dict(size=11))
-
-    return fig
-
-
-
-def genQRQMap(data4map, eu_nuts, color_palette):
+@cached_figure
+def genQRQMap(data4map, eu_nuts, color_palette, resolution = "medium"):
     fig = px.choropleth_mapbox(
         data4map,
-        geojson      = eu_nuts,
+        geojson      = mapLayer(eu_nuts, resolution, data4map["nuts_id"]),
         locations    = "nuts_id",
         featureidkey = "properties.polID",
         mapbox_style = "carto-positron",
@@ -643,6 +850,7 @@ def genQRQMap(data4map, eu_nuts, color_palette):
     return fig
 
 
+@cached_figure
 def genQRQBars(data, cpal, level):
 
     if level  == "EU":
@@ -728,6 +936,7 @@ def genQRQBars(data, cpal, level):
     return fig
 
 
+@cached_figure
 def genDem_Dots(data, dem):
         
         if dem == 'Disaggregated by Age':
@@ -768,10 +977,57 @@ def genDem_Dots(data, dem):
         return fig
 
 
-def gen_dem_Map(data4map, eu_nuts, color_palette, demographic_vars):
+def genLollipops(fig, data, color, name = None, row = None, col = None):
+    """
+    Adds a lollipop chart of the value2plot of every category in data to a figure: one marker
+    trace coloured through a per-point array, and the stems drawn from zero as None-separated
+    segments. A line trace takes a single colour, so stems sharing a colour are one trace.
+
+    Parameters:
+    fig:        Plotly figure, optionally with subplots.
+    data:       Pandas Data Frame with the category and value2plot columns.
+    color:      String with the colour of every lollipop, or a list with one colour per row.
+    name:       String with the name of the marker trace.
+    row, col:   Integers with the subplot receiving the traces.
+
+    Returns:
+    Figure:     The same figure, with the lollipops added.
+    """
+    if isinstance(color, str):
+        colors = pd.Series(color, index = data.index)
+    else:
+        colors = pd.Series(list(color), index = data.index)
+
+    fig.add_trace(
+        go.Scatter(
+            x      = data['value2plot'],
+            y      = data['category'],
+            mode   = 'markers',
+            marker = dict(color = color if isinstance(color, str) else colors.tolist()),
+            name   = name
+        ),
+        row = row, col = col
+    )
+    for stem_color, stems in data.groupby(colors, sort = False):
+        fig.add_trace(
+            go.Scatter(
+                x = [value for x in stems['value2plot'] for value in (0, x, None)],
+                y = [value for y in stems['category'] for value in (y, y, None)],
+                mode       = 'lines',
+                line       = dict(color = stem_color, width = 2),
+                showlegend = False,
+                hoverinfo  = 'skip'
+            ),
+            row = row, col = col
+        )
+    return fig
+
+
+@cached_figure
+def gen_dem_Map(data4map, eu_nuts, color_palette, demographic_vars, resolution = "medium"):
     fig = px.choropleth_mapbox(
         data4map,
-        geojson      = eu_nuts,
+        geojson      = mapLayer(eu_nuts, resolution, data4map["nuts_id"]),
         locations    = "nuts_id",
         featureidkey = "properties.polID",
         mapbox_style = "carto-positron",